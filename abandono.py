@@ -0,0 +1,179 @@
+import math
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+SEMANAS = 12
+
+# Pesos del puntaje (escala logística); positivos aumentan el riesgo
+PESOS = {
+    'base': -1.0,
+    'dias_sin_visitar': 0.08,
+    'visitas_por_semana': -0.6,
+    'tendencia': -1.5,
+    'promedio_minutos': -0.01,
+}
+
+def _pesos_tendencia(semanas: int) -> array:
+    # Pendiente por mínimos cuadrados con x = 0..semanas-1: sum(w_k * y_k)
+    media = (semanas - 1) / 2
+    varianza = sum((k - media) ** 2 for k in range(semanas)) or 1.0
+    return array('d', ((k - media) / varianza for k in range(semanas)))
+
+class MotorAbandono:
+    """
+    Calcula el riesgo de abandono de los usuarios a partir de sus ingresos.
+    Las características se guardan por columnas (un array por característica,
+    una posición por usuario) y el puntaje se calcula recorriendo las columnas
+    una sola vez. actualizar() solo vuelve a extraer las características de
+    los usuarios con ingresos nuevos o anulados desde la última corrida.
+    """
+    def __init__(self, semanas: int = SEMANAS, pesos: Optional[Dict[str, float]] = None):
+        self.semanas = semanas
+        self.pesos = dict(PESOS, **(pesos or {}))
+        self._pesos_tendencia = _pesos_tendencia(semanas)
+        self._reiniciar()
+
+    def _reiniciar(self) -> None:
+        self.ids: List[str] = []
+        self._posiciones: Dict[str, int] = {}
+        # Objeto y versión de ingresos de cada usuario en la última extracción
+        self._versiones: Dict[str, Tuple[int, int]] = {}
+        self.visitas_por_semana = array('d')
+        self.tendencia = array('d')
+        self.promedio_minutos = array('d')
+        self.ultima_visita = array('d')
+        self.dias_sin_visitar = array('d')
+        self.puntajes = array('d')
+        self.ultima_corrida: Optional[datetime] = None
+
+    @staticmethod
+    def _version(usuario) -> Tuple[int, int]:
+        # La suma crece con cada ingreso registrado o anulado; id() distingue un usuario vuelto a crear
+        return id(usuario), sum(usuario.versiones_mes.values())
+
+    def _extraer(self, usuario, desde: datetime) -> Tuple[float, float, float, float]:
+        """Características de un usuario en una sola pasada por sus ingresos"""
+        semanas = self.semanas
+        conteos = array('d', bytes(8 * semanas))
+        minutos = 0.0
+        visitas = 0
+        ultima = None
+        for registro in usuario.registro_ingreso:
+            hora = registro['hora_ingreso']
+            if ultima is None or hora > ultima:
+                ultima = hora
+            if hora >= desde:
+                semana = (hora - desde).days // 7
+                if semana < semanas:
+                    conteos[semana] += 1
+                    visitas += 1
+                    minutos += registro['tiempo_entrenamiento']
+        tendencia = sum(w * c for w, c in zip(self._pesos_tendencia, conteos))
+        # Sin ingresos se cuenta desde el registro del usuario
+        ultima = (ultima or usuario.fecha_registro).timestamp()
+        return visitas / semanas, tendencia, minutos / visitas if visitas else 0.0, ultima
+
+    def _guardar(self, id_usuario: str, caracteristicas: Tuple[float, float, float, float]) -> None:
+        posicion = self._posiciones.get(id_usuario)
+        if posicion is None:
+            self._posiciones[id_usuario] = len(self.ids)
+            self.ids.append(id_usuario)
+            for columna, valor in zip(self._columnas_extraidas(), caracteristicas):
+                columna.append(valor)
+            self.dias_sin_visitar.append(0.0)
+            self.puntajes.append(0.0)
+        else:
+            for columna, valor in zip(self._columnas_extraidas(), caracteristicas):
+                columna[posicion] = valor
+
+    def _columnas_extraidas(self) -> Tuple[array, ...]:
+        return (self.visitas_por_semana, self.tendencia, self.promedio_minutos, self.ultima_visita)
+
+    def _quitar(self, id_usuario: str) -> None:
+        # Se mueve el último usuario al hueco para no desplazar las columnas
+        posicion = self._posiciones.pop(id_usuario)
+        self._versiones.pop(id_usuario, None)
+        ultimo = self.ids.pop()
+        columnas = self._columnas_extraidas() + (self.dias_sin_visitar, self.puntajes)
+        if ultimo != id_usuario:
+            self.ids[posicion] = ultimo
+            self._posiciones[ultimo] = posicion
+            for columna in columnas:
+                columna[posicion] = columna[-1]
+        for columna in columnas:
+            columna.pop()
+
+    def _puntuar(self, ahora: datetime) -> None:
+        """Recalcula días sin visitar y puntajes de todos los usuarios en una pasada"""
+        p = self.pesos
+        referencia = ahora.timestamp()
+        base, p_dias, p_visitas = p['base'], p['dias_sin_visitar'], p['visitas_por_semana']
+        p_tendencia, p_minutos = p['tendencia'], p['promedio_minutos']
+        dias = array('d', (max(0.0, (referencia - u) / 86400) for u in self.ultima_visita))
+        self.dias_sin_visitar = dias
+        self.puntajes = array('d', (
+            1 / (1 + math.exp(-max(-60.0, min(60.0, base + p_dias * d + p_visitas * v
+                                                 + p_tendencia * t + p_minutos * m))))
+            for d, v, t, m in zip(dias, self.visitas_por_semana, self.tendencia, self.promedio_minutos)))
+        self.ultima_corrida = ahora
+
+    def puntuar_todos(self, usuarios: Iterable[Any], ahora: Optional[datetime] = None) -> int:
+        """
+        Extrae las características de todos los usuarios y los puntúa
+        Returns:
+            Cantidad de usuarios puntuados
+        """
+        ahora = ahora or datetime.now()
+        desde = ahora - timedelta(weeks=self.semanas)
+        self._reiniciar()
+        for usuario in usuarios:
+            self._guardar(usuario.id_usuario, self._extraer(usuario, desde))
+            self._versiones[usuario.id_usuario] = self._version(usuario)
+        self._puntuar(ahora)
+        return len(self.ids)
+
+    def actualizar(self, usuarios: Dict[str, Any], ahora: Optional[datetime] = None) -> int:
+        """
+        Vuelve a extraer solo los usuarios nuevos o con ingresos modificados desde
+        la última corrida, quita los eliminados y recalcula los puntajes.
+        Las ventanas de los usuarios sin cambios no se desplazan; conviene una
+        corrida completa periódica (por ejemplo, diaria).
+        Args:
+            usuarios: Diccionario id_usuario -> Usuario (gimnasio.usuarios)
+        Returns:
+            Cantidad de usuarios cuyas características se recalcularon
+        """
+        ahora = ahora or datetime.now()
+        desde = ahora - timedelta(weeks=self.semanas)
+        for id_usuario in [i for i in self.ids if i not in usuarios]:
+            self._quitar(id_usuario)
+        recalculados = 0
+        for id_usuario, usuario in usuarios.items():
+            version = self._version(usuario)
+            if self._versiones.get(id_usuario) != version:
+                self._guardar(id_usuario, self._extraer(usuario, desde))
+                self._versiones[id_usuario] = version
+                recalculados += 1
+        self._puntuar(ahora)
+        return recalculados
+
+    def caracteristicas(self, id_usuario: str) -> Dict[str, float]:
+        """Características y puntaje de un usuario"""
+        posicion = self._posiciones.get(id_usuario)
+        if posicion is None:
+            raise ValueError(f"Usuario con ID {id_usuario} no puntuado")
+        return {
+            'visitas_por_semana': self.visitas_por_semana[posicion],
+            'tendencia': self.tendencia[posicion],
+            'dias_sin_visitar': self.dias_sin_visitar[posicion],
+            'promedio_minutos': self.promedio_minutos[posicion],
+            'puntaje': self.puntajes[posicion],
+        }
+
+    def en_riesgo(self, usuarios: Dict[str, Any], umbral: float = 0.7) -> List[Tuple[str, float]]:
+        """Usuarios con membresía activa y puntaje mayor o igual al umbral, de mayor a menor riesgo"""
+        return sorted(((id_usuario, puntaje) for id_usuario, puntaje in zip(self.ids, self.puntajes)
+                       if puntaje >= umbral and id_usuario in usuarios
+                       and usuarios[id_usuario].membresia == "Activa"),
+                      key=lambda par: par[1], reverse=True)
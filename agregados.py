@@ -0,0 +1,150 @@
+import csv
+import calendar
+from datetime import date
+from typing import Dict, Any, Iterable, Tuple
+from reportes import nuevo_pdf, escribir, dibujar_tabla
+
+class AgregadoMensual:
+    """
+    Acumulador de la actividad de todo el gimnasio en un mes.
+    Cada usuario se recorre una sola vez y solo se guardan totales por día,
+    así que la memoria no depende de la cantidad de ingresos. Dos agregados
+    del mismo mes se pueden combinar, lo que permite calcular uno por
+    fragmento de usuarios y juntarlos al final.
+    """
+    def __init__(self, mes: int, anio: int):
+        self.mes = mes
+        self.anio = anio
+        self.usuarios_activos = 0
+        self.usuarios_congelados = 0
+        self.usuarios_con_visitas = 0
+        self.visitas_por_dia: Dict[int, int] = {}
+        self.sesiones_completas = 0
+        self.minutos_totales = 0.0
+        # Por día: (suma de IMC, cantidad de mediciones)
+        self.imc_por_dia: Dict[int, Tuple[float, int]] = {}
+        # Variación de IMC dentro del mes de quienes se midieron más de una vez
+        self.suma_variacion_imc = 0.0
+        self.usuarios_con_variacion = 0
+
+    def agregar_usuario(self, usuario) -> None:
+        """Suma los ingresos y medidas del mes de un usuario"""
+        mes, anio = self.mes, self.anio
+        if usuario.membresia == "Activa":
+            self.usuarios_activos += 1
+        else:
+            self.usuarios_congelados += 1
+
+        visitas = self.visitas_por_dia
+        tuvo_visitas = False
+        for registro in usuario.registro_ingreso:
+            fecha = registro['fecha']
+            if fecha.month != mes or fecha.year != anio:
+                continue
+            tuvo_visitas = True
+            visitas[fecha.day] = visitas.get(fecha.day, 0) + 1
+            if registro['hora_salida']:
+                self.sesiones_completas += 1
+                self.minutos_totales += registro['tiempo_entrenamiento']
+        if tuvo_visitas:
+            self.usuarios_con_visitas += 1
+
+        imc_por_dia = self.imc_por_dia
+        primera = ultima = None
+        for medida in usuario.medidas:
+            fecha = medida['fecha']
+            if fecha.month != mes or fecha.year != anio:
+                continue
+            suma, cantidad = imc_por_dia.get(fecha.day, (0.0, 0))
+            imc_por_dia[fecha.day] = (suma + medida['imc'], cantidad + 1)
+            if primera is None or fecha < primera['fecha']:
+                primera = medida
+            if ultima is None or fecha >= ultima['fecha']:
+                ultima = medida
+        if primera is not None and primera is not ultima:
+            self.suma_variacion_imc += ultima['imc'] - primera['imc']
+            self.usuarios_con_variacion += 1
+
+    def agregar_usuarios(self, usuarios: Iterable[Any]) -> 'AgregadoMensual':
+        for usuario in usuarios:
+            self.agregar_usuario(usuario)
+        return self
+
+    def combinar(self, otro: 'AgregadoMensual') -> 'AgregadoMensual':
+        """Suma a este agregado otro del mismo mes (por ejemplo, de otro fragmento)"""
+        if (otro.mes, otro.anio) != (self.mes, self.anio):
+            raise ValueError("Solo se pueden combinar agregados del mismo mes")
+        self.usuarios_activos += otro.usuarios_activos
+        self.usuarios_congelados += otro.usuarios_congelados
+        self.usuarios_con_visitas += otro.usuarios_con_visitas
+        for dia, visitas in otro.visitas_por_dia.items():
+            self.visitas_por_dia[dia] = self.visitas_por_dia.get(dia, 0) + visitas
+        self.sesiones_completas += otro.sesiones_completas
+        self.minutos_totales += otro.minutos_totales
+        for dia, (suma, cantidad) in otro.imc_por_dia.items():
+            suma_actual, cantidad_actual = self.imc_por_dia.get(dia, (0.0, 0))
+            self.imc_por_dia[dia] = (suma_actual + suma, cantidad_actual + cantidad)
+        self.suma_variacion_imc += otro.suma_variacion_imc
+        self.usuarios_con_variacion += otro.usuarios_con_variacion
+        return self
+
+    def resumen(self) -> Dict[str, Any]:
+        """Totales del mes"""
+        visitas = sum(self.visitas_por_dia.values())
+        mediciones = sum(cantidad for _, cantidad in self.imc_por_dia.values())
+        suma_imc = sum(suma for suma, _ in self.imc_por_dia.values())
+        return {
+            'mes': self.mes,
+            'anio': self.anio,
+            'total_usuarios': self.usuarios_activos + self.usuarios_congelados,
+            'usuarios_activos': self.usuarios_activos,
+            'usuarios_congelados': self.usuarios_congelados,
+            'usuarios_con_visitas': self.usuarios_con_visitas,
+            'visitas_totales': visitas,
+            'promedio_minutos_sesion': (self.minutos_totales / self.sesiones_completas
+                                        if self.sesiones_completas else 0.0),
+            'mediciones': mediciones,
+            'imc_promedio': suma_imc / mediciones if mediciones else None,
+            'variacion_imc_promedio': (self.suma_variacion_imc / self.usuarios_con_variacion
+                                       if self.usuarios_con_variacion else None),
+        }
+
+    def filas_por_dia(self) -> Iterable[Tuple[date, int, Any, int]]:
+        """Filas (fecha, visitas, IMC promedio o None, mediciones) de cada día del mes"""
+        for dia in range(1, calendar.monthrange(self.anio, self.mes)[1] + 1):
+            suma, cantidad = self.imc_por_dia.get(dia, (0.0, 0))
+            yield (date(self.anio, self.mes, dia), self.visitas_por_dia.get(dia, 0),
+                   round(suma / cantidad, 2) if cantidad else None, cantidad)
+
+def agregado_mensual(usuarios: Iterable[Any], mes: int, anio: int) -> AgregadoMensual:
+    """Calcula el agregado de un mes recorriendo los usuarios una sola vez"""
+    return AgregadoMensual(mes, anio).agregar_usuarios(usuarios)
+
+def exportar_csv(agregado: AgregadoMensual, archivo: str) -> None:
+    """Guarda el detalle por día del agregado en un CSV"""
+    with open(archivo, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['fecha', 'visitas', 'imc_promedio', 'mediciones'])
+        for fecha, visitas, imc, mediciones in agregado.filas_por_dia():
+            escritor.writerow([fecha.isoformat(), visitas, '' if imc is None else imc, mediciones])
+
+def exportar_pdf(agregado: AgregadoMensual, archivo: str) -> None:
+    """Genera el PDF con el resumen del mes y el detalle por día"""
+    resumen = agregado.resumen()
+    pdf = nuevo_pdf()
+    escribir(pdf, "Reporte General del Gimnasio", 10, 'C')
+    escribir(pdf, f"Mes: {agregado.mes}, Año: {agregado.anio}")
+    escribir(pdf, f"Usuarios: {resumen['total_usuarios']} "
+                  f"(activos: {resumen['usuarios_activos']}, congelados: {resumen['usuarios_congelados']})")
+    escribir(pdf, f"Usuarios con asistencias: {resumen['usuarios_con_visitas']}")
+    escribir(pdf, f"Total de asistencias: {resumen['visitas_totales']}")
+    escribir(pdf, f"Duración promedio de sesión: {resumen['promedio_minutos_sesion']:.2f} minutos")
+    if resumen['imc_promedio'] is not None:
+        escribir(pdf, f"IMC promedio: {resumen['imc_promedio']:.2f} ({resumen['mediciones']} mediciones)")
+    if resumen['variacion_imc_promedio'] is not None:
+        escribir(pdf, f"Variación promedio de IMC en el mes: {resumen['variacion_imc_promedio']:+.2f}")
+    pdf.ln(4)
+    dibujar_tabla(pdf, ["Fecha", "Asistencias", "IMC promedio", "Mediciones"], [45, 40, 45, 40],
+                  ((fecha.strftime('%d/%m/%Y'), visitas, '-' if imc is None else f"{imc:.2f}", mediciones)
+                   for fecha, visitas, imc, mediciones in agregado.filas_por_dia()))
+    pdf.output(archivo)
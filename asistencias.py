@@ -0,0 +1,152 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+# (hora_ingreso, id_usuario, hora_salida)
+Asistencia = Tuple[datetime, str, Optional[datetime]]
+
+# Hasta esta cantidad de asistencias, insertarlas o quitarlas de a una es más barato que reconstruir
+CAMBIO_INDIVIDUAL = 32
+
+# Las sesiones más largas (salidas olvidadas, varios días) no amplían la ventana revisada
+SESION_LARGA = timedelta(hours=12)
+
+class IndiceAsistencias:
+    """
+    Índice global de asistencias ordenado por hora de ingreso.
+    Guarda las horas de ingreso en una lista ordenada aparte para buscar con
+    bisect. Para las consultas de solapamiento se lleva la duración máxima
+    registrada: una sesión que toca un intervalo tuvo que empezar, como mucho,
+    esa duración antes de su inicio. Así ambas consultas cuestan
+    O(log n + k), siendo k las sesiones que empiezan en la ventana revisada.
+    Las sesiones de más de SESION_LARGA no cuentan para esa duración: se
+    guardan además en una lista aparte que se recorre entera, así que una
+    salida cargada días después no obliga a revisar días de ingresos.
+    """
+    def __init__(self):
+        self._inicios: List[datetime] = []
+        self._asistencias: List[Asistencia] = []
+        self._largas: List[Asistencia] = []
+        # Cantidad de sesiones por duración, para recalcular la máxima al quitar sesiones
+        self._duraciones: Dict[timedelta, int] = {}
+        self.duracion_maxima = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._inicios)
+
+    def _contar(self, asistencia: Asistencia) -> None:
+        hora_ingreso, _, hora_salida = asistencia
+        if hora_salida is None:
+            return
+        duracion = hora_salida - hora_ingreso
+        if duracion > SESION_LARGA:
+            self._largas.append(asistencia)
+            return
+        self._duraciones[duracion] = self._duraciones.get(duracion, 0) + 1
+        if duracion > self.duracion_maxima:
+            self.duracion_maxima = duracion
+
+    def _descontar(self, asistencia: Asistencia) -> None:
+        hora_ingreso, _, hora_salida = asistencia
+        if hora_salida is None:
+            return
+        duracion = hora_salida - hora_ingreso
+        if duracion > SESION_LARGA:
+            self._largas.remove(asistencia)
+            return
+        if self._duraciones[duracion] > 1:
+            self._duraciones[duracion] -= 1
+            return
+        del self._duraciones[duracion]
+        if duracion == self.duracion_maxima:
+            self.duracion_maxima = max(self._duraciones, default=timedelta(0))
+
+    def _recontar(self) -> None:
+        self._largas = []
+        self._duraciones = {}
+        self.duracion_maxima = timedelta(0)
+        for asistencia in self._asistencias:
+            self._contar(asistencia)
+
+    def agregar(self, id_usuario: str, hora_ingreso: datetime, hora_salida: Optional[datetime] = None) -> None:
+        """Agrega una asistencia; si llega en orden cronológico solo se anexa al final"""
+        asistencia = (hora_ingreso, id_usuario, hora_salida)
+        if not self._inicios or hora_ingreso >= self._inicios[-1]:
+            self._inicios.append(hora_ingreso)
+            self._asistencias.append(asistencia)
+        else:
+            posicion = bisect_right(self._inicios, hora_ingreso)
+            self._inicios.insert(posicion, hora_ingreso)
+            self._asistencias.insert(posicion, asistencia)
+        self._contar(asistencia)
+
+    def agregar_varias(self, asistencias: List[Asistencia]) -> None:
+        """
+        Agrega un lote de asistencias (hora_ingreso, id_usuario, hora_salida).
+        Se ordena el lote y, si es posterior a todo lo indexado, se anexa; si no,
+        se mezcla con el índice en una sola pasada.
+        """
+        if not asistencias:
+            return
+        lote = sorted(asistencias, key=lambda a: a[0])
+        if len(lote) <= CAMBIO_INDIVIDUAL and self._inicios and lote[0][0] < self._inicios[-1]:
+            for hora_ingreso, id_usuario, hora_salida in lote:
+                self.agregar(id_usuario, hora_ingreso, hora_salida)
+            return
+        if not self._inicios or lote[0][0] >= self._inicios[-1]:
+            self._asistencias.extend(lote)
+            self._inicios.extend(a[0] for a in lote)
+        else:
+            self._asistencias = list(heapq.merge(self._asistencias, lote, key=lambda a: a[0]))
+            self._inicios = [a[0] for a in self._asistencias]
+        for asistencia in lote:
+            self._contar(asistencia)
+
+    def eliminar(self, id_usuario: str, hora_ingreso: datetime, hora_salida: Optional[datetime] = None) -> bool:
+        """
+        Quita una asistencia
+        Returns:
+            True si estaba en el índice
+        """
+        posicion = bisect_left(self._inicios, hora_ingreso)
+        while posicion < len(self._inicios) and self._inicios[posicion] == hora_ingreso:
+            if self._asistencias[posicion] == (hora_ingreso, id_usuario, hora_salida):
+                del self._inicios[posicion]
+                self._descontar(self._asistencias.pop(posicion))
+                return True
+            posicion += 1
+        return False
+
+    def eliminar_usuario(self, id_usuario: str, asistencias: List[Asistencia]) -> None:
+        """Quita las asistencias de un usuario; si son muchas, reconstruye el índice en una pasada"""
+        if len(asistencias) <= CAMBIO_INDIVIDUAL:
+            for hora_ingreso, _, hora_salida in asistencias:
+                self.eliminar(id_usuario, hora_ingreso, hora_salida)
+            return
+        self._asistencias = [a for a in self._asistencias if a[1] != id_usuario]
+        self._inicios = [a[0] for a in self._asistencias]
+        self._recontar()
+
+    def ingresos_entre(self, desde: datetime, hasta: datetime) -> List[Asistencia]:
+        """Asistencias cuya hora de ingreso está en [desde, hasta], en orden cronológico"""
+        return self._asistencias[bisect_left(self._inicios, desde):bisect_right(self._inicios, hasta)]
+
+    def presentes_entre(self, desde: datetime, hasta: datetime) -> List[Asistencia]:
+        """
+        Asistencias que se solapan con [desde, hasta].
+        Una sesión sin hora de salida se toma como un instante en su ingreso.
+        """
+        limite = desde - self.duracion_maxima
+        inicio = bisect_left(self._inicios, limite)
+        fin = bisect_right(self._inicios, hasta)
+        presentes = [a for a in self._asistencias[inicio:fin] if (a[2] or a[0]) >= desde]
+        # Las sesiones largas que empezaron antes de la ventana revisada
+        largas = [a for a in self._largas if a[0] < limite and a[2] >= desde]
+        if largas:
+            presentes = sorted(largas + presentes, key=lambda a: a[0])
+        return presentes
+
+    def usuarios_presentes(self, desde: datetime, hasta: datetime) -> Set[str]:
+        """IDs de los usuarios que estuvieron en el gimnasio en algún momento de [desde, hasta]"""
+        return {a[1] for a in self.presentes_entre(desde, hasta)}
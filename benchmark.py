@@ -0,0 +1,439 @@
+import sys
+import os
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+from models import Usuario, Gimnasio
+from exceptions import validar_datos_usuario, validar_medidas
+
+ESCALAS_POR_DEFECTO = [1_000, 100_000, 1_000_000]
+TOLERANCIA_POR_DEFECTO = 0.20
+
+NOMBRES = ["Juan", "Maria", "Pedro", "Ana", "Luis", "Carmen", "Jorge", "Lucia",
+           "Andres", "Sofia", "Carlos", "Valentina", "Diego", "Camila", "Mateo"]
+APELLIDOS = ["Perez", "Gomez", "Rodriguez", "Lopez", "Martinez", "Garcia",
+             "Hernandez", "Diaz", "Torres", "Ramirez", "Vargas", "Castro"]
+
+# Generadores de datos sintéticos
+
+def generar_usuarios(cantidad: int, semilla: int = 42) -> Iterator[Usuario]:
+    """Genera usuarios sintéticos con datos válidos"""
+    rng = random.Random(semilla)
+    for i in range(cantidad):
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+        yield Usuario(
+            id_usuario=f"U{i:07d}",
+            nombre=nombre,
+            correo=f"usuario{i}@ejemplo.com",
+            direccion=f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}",
+            telefono=f"3{rng.randint(100000000, 999999999)}"
+        )
+
+def generar_medidas(cantidad: int, semilla: int = 42) -> Iterator[Tuple[float, float]]:
+    """Genera pares (peso, altura) dentro de los rangos válidos"""
+    rng = random.Random(semilla)
+    for _ in range(cantidad):
+        yield round(rng.uniform(45, 120), 1), round(rng.uniform(1.45, 2.0), 2)
+
+def generar_ingresos(ids_usuarios: List[str], cantidad: int, anios: int = 3,
+                     semilla: int = 42) -> Iterator[Tuple[str, Any, datetime, datetime]]:
+    """
+    Genera ingresos repartidos en los últimos `anios` años
+    Returns:
+        Tuplas (id_usuario, fecha, hora_ingreso, hora_salida) en orden cronológico
+    """
+    rng = random.Random(semilla)
+    fin = datetime.now().replace(microsecond=0)
+    inicio = fin - timedelta(days=365 * anios)
+    paso = (fin - inicio) / max(cantidad, 1)
+    for i in range(cantidad):
+        hora_ingreso = inicio + paso * i
+        hora_salida = hora_ingreso + timedelta(minutes=rng.randint(20, 150))
+        yield rng.choice(ids_usuarios), hora_ingreso.date(), hora_ingreso, hora_salida
+
+def poblar_gimnasio(cantidad: int, semilla: int = 42) -> Gimnasio:
+    """Crea un gimnasio con `cantidad` usuarios sintéticos"""
+    gimnasio = Gimnasio()
+    for usuario in generar_usuarios(cantidad, semilla):
+        gimnasio.agregar_usuario(usuario)
+    return gimnasio
+
+# Casos de benchmark. Cada caso recibe la escala y retorna (operaciones, segundos)
+
+def _cronometrar(func: Callable[[], Any], repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        func()
+    return time.perf_counter() - inicio
+
+# Incluye la detección de duplicados, que domina el costo de cada alta
+def caso_agregar_usuario(escala: int) -> Tuple[int, float]:
+    usuarios = list(generar_usuarios(escala))
+    gimnasio = Gimnasio()
+    inicio = time.perf_counter()
+    for usuario in usuarios:
+        gimnasio.agregar_usuario(usuario)
+    return escala, time.perf_counter() - inicio
+
+def caso_registrar_ingreso(escala: int) -> Tuple[int, float]:
+    gimnasio = poblar_gimnasio(max(escala // 100, 1))
+    ids = list(gimnasio.usuarios)
+    ingresos = list(generar_ingresos(ids, escala))
+    inicio = time.perf_counter()
+    for id_usuario, fecha, hora_ingreso, hora_salida in ingresos:
+        gimnasio.registrar_ingreso(id_usuario, fecha, hora_ingreso, hora_salida)
+    return escala, time.perf_counter() - inicio
+
+def caso_buscar_usuarios(escala: int) -> Tuple[int, float]:
+    gimnasio = poblar_gimnasio(escala)
+    repeticiones = 20
+    def buscar():
+        gimnasio.buscar_usuarios('nombre', 'mar')
+        gimnasio.buscar_usuarios('membresia', 'Activa')
+    return repeticiones, _cronometrar(buscar, repeticiones)
+
+def caso_obtener_estadisticas(escala: int) -> Tuple[int, float]:
+    gimnasio = poblar_gimnasio(escala)
+    repeticiones = 20
+    return repeticiones, _cronometrar(gimnasio.obtener_estadisticas, repeticiones)
+
+def caso_usuarios_presentes(escala: int) -> Tuple[int, float]:
+    gimnasio = poblar_gimnasio(max(escala // 100, 1))
+    for registro in generar_ingresos(list(gimnasio.usuarios), escala):
+        gimnasio.registrar_ingreso(*registro)
+    rng = random.Random(7)
+    inicios = [gimnasio.indice_asistencias._inicios[rng.randrange(escala)] for _ in range(100)]
+    consultas = iter(inicios * 10)
+    def consultar():
+        desde = next(consultas)
+        gimnasio.usuarios_presentes(desde, desde + timedelta(hours=2))
+    return 1000, _cronometrar(consultar, 1000)
+
+def caso_obtener_historial_medidas(escala: int) -> Tuple[int, float]:
+    usuario = next(generar_usuarios(1))
+    for peso, altura in generar_medidas(escala):
+        usuario.registrar_medidas(peso, altura)
+    repeticiones = 10
+    return repeticiones, _cronometrar(usuario.obtener_historial_medidas, repeticiones)
+
+def caso_validacion(escala: int) -> Tuple[int, float]:
+    datos = [(u.nombre, u.correo, u.telefono) for u in generar_usuarios(escala)]
+    medidas = list(generar_medidas(escala))
+    inicio = time.perf_counter()
+    for (nombre, correo, telefono), (peso, altura) in zip(datos, medidas):
+        validar_datos_usuario(nombre, correo, telefono)
+        validar_medidas(peso, altura)
+    return escala, time.perf_counter() - inicio
+
+def caso_generacion_pdf(escala: int) -> Tuple[int, float]:
+    from reportes import MotorReportes
+    gimnasio = Gimnasio()
+    usuario = next(generar_usuarios(1))
+    gimnasio.agregar_usuario(usuario)
+    fin = datetime.now()
+    for _, fecha, hora_ingreso, hora_salida in generar_ingresos([usuario.id_usuario], escala, anios=0):
+        gimnasio.registrar_ingreso(usuario.id_usuario, fecha, hora_ingreso, hora_salida)
+    # Caché vacía para medir el dibujo del PDF y no un acierto
+    with tempfile.TemporaryDirectory() as directorio:
+        motor = MotorReportes(directorio)
+        inicio = time.perf_counter()
+        motor.reporte_actividad(usuario, fin.month, fin.year)
+        return 1, time.perf_counter() - inicio
+
+# Nombre del caso -> (función, escala máxima razonable o None si no tiene límite)
+CASOS: Dict[str, Tuple[Callable[[int], Tuple[int, float]], Optional[int]]] = {
+    'agregar_usuario': (caso_agregar_usuario, None),
+    'registrar_ingreso': (caso_registrar_ingreso, None),
+    'buscar_usuarios': (caso_buscar_usuarios, None),
+    'obtener_estadisticas': (caso_obtener_estadisticas, None),
+    'usuarios_presentes': (caso_usuarios_presentes, None),
+    'obtener_historial_medidas': (caso_obtener_historial_medidas, None),
+    'validacion': (caso_validacion, None),
+    'generacion_pdf': (caso_generacion_pdf, 100_000),
+}
+
+def _falta_dependencia_opcional(error: Exception) -> bool:
+    if isinstance(error, ImportError):
+        return (error.name or '').split('.')[0] == 'fpdf'
+    return isinstance(error, FileNotFoundError) and str(error.filename or '').endswith('.ttf')
+
+def ejecutar_benchmarks(escalas: List[int], casos: Optional[List[str]] = None,
+                        repeticiones: int = 3) -> Dict[str, Any]:
+    """
+    Ejecuta los casos de benchmark en las escalas indicadas
+    Args:
+        escalas: Tamaños de datos a probar
+        casos: Nombres de casos a ejecutar (todos si es None)
+        repeticiones: Veces que se repite cada medición; se guarda la mejor
+    Returns:
+        Diccionario serializable a JSON con los resultados
+    """
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for nombre in casos or list(CASOS):
+        funcion, escala_maxima = CASOS[nombre]
+        for escala in escalas:
+            clave = f"{nombre}@{escala}"
+            if escala_maxima is not None and escala > escala_maxima:
+                resultados[clave] = {"omitido": f"escala mayor a {escala_maxima}"}
+                continue
+            try:
+                mediciones = [funcion(escala) for _ in range(repeticiones)]
+            except Exception as e:
+                # Solo la falta de fpdf o de la fuente DejaVu omite el caso; cualquier otro error se informa
+                tipo = "omitido" if _falta_dependencia_opcional(e) else "error"
+                resultados[clave] = {tipo: f"{e.__class__.__name__}: {e}"}
+                print(f"{clave:<40} {tipo}: {e}")
+                continue
+            operaciones, segundos = min(mediciones, key=lambda m: m[1] / m[0])
+            resultados[clave] = {
+                "operaciones": operaciones,
+                "segundos": round(segundos, 6),
+                "us_por_operacion": round(segundos / operaciones * 1e6, 3)
+            }
+            print(f"{clave:<40} {resultados[clave]['us_por_operacion']:>14.3f} us/op")
+    return {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados
+    }
+
+MODULOS_IMPORTACION = ['main', 'requisitos', 'gui', 'models', 'exceptions', 'fpdf', 'tkinter']
+
+def medir_tiempo_importacion(modulo: str, repeticiones: int = 5) -> Optional[int]:
+    """
+    Mide el tiempo acumulado de importar un módulo con `python -X importtime`
+    en un intérprete nuevo
+    Returns:
+        Mejor tiempo acumulado en microsegundos, o None si el módulo no se pudo importar
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if proceso.returncode != 0:
+            return None
+        for linea in proceso.stderr.splitlines():
+            # Formato: "import time: self [us] | cumulative | imported package"
+            partes = linea.split("|")
+            if len(partes) == 3 and partes[2].strip() == modulo and partes[2].startswith(" " + modulo):
+                acumulado = int(partes[1])
+                mejor = acumulado if mejor is None else min(mejor, acumulado)
+    return mejor
+
+def ejecutar_benchmark_importacion(modulos: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Mide el tiempo de importación de los módulos del sistema y de las
+    dependencias pesadas (fpdf, tkinter) que solo se cargan bajo demanda
+    """
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for modulo in modulos or MODULOS_IMPORTACION:
+        clave = f"importacion@{modulo}"
+        microsegundos = medir_tiempo_importacion(modulo)
+        if microsegundos is None:
+            resultados[clave] = {"omitido": f"no se pudo importar {modulo}"}
+            continue
+        resultados[clave] = {"operaciones": 1, "segundos": microsegundos / 1e6,
+                             "us_por_operacion": microsegundos}
+        print(f"{clave:<40} {microsegundos:>14} us")
+    return resultados
+
+def ejecutar_benchmark_fragmentos(usuarios: int, lista_fragmentos: List[int],
+                                  ingresos: int = 200_000) -> Dict[str, Dict[str, Any]]:
+    """
+    Mide GimnasioDistribuido con distinta cantidad de procesos frente a un
+    Gimnasio local: ingresos masivos y consultas de dispersión/recolección
+    """
+    from fragmentos import GimnasioDistribuido
+    resultados: Dict[str, Dict[str, Any]] = {}
+    ids = [f"U{i:07d}" for i in range(usuarios)]
+    lote_ingresos = list(generar_ingresos(ids, ingresos))
+
+    def medir(clave: str, operaciones: int, func: Callable[[], Any]) -> None:
+        segundos = _cronometrar(func, 1)
+        resultados[clave] = {"operaciones": operaciones, "segundos": round(segundos, 6),
+                             "us_por_operacion": round(segundos / operaciones * 1e6, 3)}
+        print(f"{clave:<40} {resultados[clave]['us_por_operacion']:>14.3f} us/op")
+
+    def consultas(gimnasio) -> None:
+        for _ in range(5):
+            gimnasio.buscar_usuarios('membresia', 'Congelada')
+            gimnasio.obtener_estadisticas()
+
+    gimnasio = poblar_gimnasio(usuarios)
+    def ingresos_locales():
+        for registro in lote_ingresos:
+            gimnasio.registrar_ingreso(*registro)
+    medir("fragmentos_ingresos@local", ingresos, ingresos_locales)
+    medir("fragmentos_consultas@local", 10, lambda: consultas(gimnasio))
+    del gimnasio
+
+    for cantidad in lista_fragmentos:
+        with GimnasioDistribuido(cantidad) as distribuido:
+            distribuido.agregar_usuarios(generar_usuarios(usuarios))
+            medir(f"fragmentos_ingresos@{cantidad}", ingresos,
+                  lambda: distribuido.registrar_ingresos(lote_ingresos))
+            medir(f"fragmentos_consultas@{cantidad}", 10, lambda: consultas(distribuido))
+    return resultados
+
+def generar_lecturas_torniquete(ids_usuarios: List[str], cantidad: int, repeticion: float = 0.3,
+                                semilla: int = 42) -> Iterator[Tuple[str, datetime]]:
+    """
+    Genera una ráfaga de lecturas (id_usuario, momento) en la apertura: unas 20
+    por segundo, y con probabilidad `repeticion` la tarjeta anterior se vuelve
+    a pasar unos segundos después
+    """
+    rng = random.Random(semilla)
+    momento = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
+    anterior = None
+    for _ in range(cantidad):
+        momento += timedelta(milliseconds=rng.randint(10, 90))
+        if anterior is not None and rng.random() < repeticion:
+            yield anterior, momento + timedelta(seconds=rng.randint(1, 5))
+        else:
+            anterior = rng.choice(ids_usuarios)
+            yield anterior, momento
+
+def ejecutar_benchmark_torniquetes(usuarios: int = 10_000, lecturas: int = 200_000,
+                                   repeticion: float = 0.3) -> Dict[str, Dict[str, Any]]:
+    """
+    Mide una ráfaga de lecturas de torniquete registradas una por una contra la
+    ingesta con descarte de duplicados y lotes, sin hilo y con hilo
+    """
+    from torniquetes import IngestaTorniquetes
+    resultados: Dict[str, Dict[str, Any]] = {}
+    ids = [f"U{i:07d}" for i in range(usuarios)]
+    rafaga = list(generar_lecturas_torniquete(ids, lecturas, repeticion))
+
+    def medir(clave: str, func: Callable[[Gimnasio], Optional[Dict[str, Any]]]) -> None:
+        gimnasio = poblar_gimnasio(usuarios)
+        inicio = time.perf_counter()
+        estadisticas = func(gimnasio) or {}
+        segundos = time.perf_counter() - inicio
+        resultados[clave] = {"operaciones": lecturas, "segundos": round(segundos, 6),
+                             "us_por_operacion": round(segundos / lecturas * 1e6, 3),
+                             "lecturas_por_segundo": round(lecturas / segundos),
+                             "visitas_registradas": sum(len(u.registro_ingreso) for u in gimnasio.usuarios.values()),
+                             "proporcion_duplicadas": round(estadisticas.get('proporcion_duplicadas', 0.0), 4),
+                             "rechazadas": estadisticas.get('rechazadas', 0)}
+        print(f"{clave:<40} {resultados[clave]['us_por_operacion']:>14.3f} us/op  "
+              f"{resultados[clave]['lecturas_por_segundo']:>10} lect/s  "
+              f"duplicadas {resultados[clave]['proporcion_duplicadas']:.1%}")
+
+    def directo(gimnasio):
+        for id_usuario, momento in rafaga:
+            gimnasio.registrar_ingreso(id_usuario, momento.date(), momento)
+
+    def sin_hilo(gimnasio):
+        ingesta = IngestaTorniquetes(gimnasio)
+        for id_usuario, momento in rafaga:
+            ingesta.recibir(id_usuario, momento)
+        ingesta.vaciar()
+        return ingesta.estadisticas()
+
+    def con_hilo(gimnasio):
+        ingesta = IngestaTorniquetes(gimnasio)
+        ingesta.iniciar()
+        for id_usuario, momento in rafaga:
+            ingesta.recibir(id_usuario, momento)
+        ingesta.detener()
+        return ingesta.estadisticas()
+
+    medir("torniquetes@directo", directo)
+    medir("torniquetes@ingesta", sin_hilo)
+    medir("torniquetes@ingesta_hilo", con_hilo)
+    return resultados
+
+def comparar_con_baseline(actual: Dict[str, Any], baseline: Dict[str, Any],
+                          tolerancia: float = TOLERANCIA_POR_DEFECTO) -> List[Dict[str, Any]]:
+    """
+    Compara resultados contra una baseline guardada
+    Args:
+        actual: Resultados de ejecutar_benchmarks
+        baseline: Resultados guardados previamente
+        tolerancia: Aumento relativo permitido en us_por_operacion (0.20 = 20%)
+    Returns:
+        Lista de regresiones encontradas
+    """
+    regresiones = []
+    for clave, medicion in actual["resultados"].items():
+        anterior = baseline.get("resultados", {}).get(clave)
+        if not anterior or "us_por_operacion" not in anterior:
+            continue
+        if "error" in medicion:
+            # Un caso que antes se medía y ahora falla es una regresión
+            regresiones.append({
+                "caso": clave,
+                "baseline_us": anterior["us_por_operacion"],
+                "actual_us": None,
+                "error": medicion["error"]
+            })
+            continue
+        if "us_por_operacion" not in medicion:
+            continue
+        razon = medicion["us_por_operacion"] / anterior["us_por_operacion"] if anterior["us_por_operacion"] else 1.0
+        if razon > 1 + tolerancia:
+            regresiones.append({
+                "caso": clave,
+                "baseline_us": anterior["us_por_operacion"],
+                "actual_us": medicion["us_por_operacion"],
+                "razon": round(razon, 2)
+            })
+    return regresiones
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de las operaciones del gimnasio")
+    parser.add_argument("--escalas", type=int, nargs="+", default=ESCALAS_POR_DEFECTO)
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--importacion", action="store_true",
+                        help="Mide también el tiempo de importación de los módulos (-X importtime)")
+    parser.add_argument("--fragmentos", type=int, nargs="+",
+                        help="Mide GimnasioDistribuido con estas cantidades de procesos")
+    parser.add_argument("--usuarios-fragmentos", type=int, default=100_000)
+    parser.add_argument("--torniquetes", type=int, metavar="LECTURAS",
+                        help="Mide la ingesta de torniquetes con esta cantidad de lecturas")
+    parser.add_argument("--salida", default="benchmark_resultados.json",
+                        help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--baseline", help="Archivo JSON de baseline contra el cual comparar")
+    parser.add_argument("--guardar-baseline", action="store_true",
+                        help="Guarda los resultados también como nueva baseline")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_POR_DEFECTO)
+    args = parser.parse_args(argv)
+
+    actual = ejecutar_benchmarks(args.escalas, args.casos, args.repeticiones)
+    if args.importacion:
+        actual["resultados"].update(ejecutar_benchmark_importacion())
+    if args.fragmentos:
+        actual["resultados"].update(ejecutar_benchmark_fragmentos(args.usuarios_fragmentos, args.fragmentos))
+    if args.torniquetes:
+        actual["resultados"].update(ejecutar_benchmark_torniquetes(lecturas=args.torniquetes))
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(actual, archivo, indent=2)
+
+    codigo = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.guardar_baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            baseline = json.load(archivo)
+        regresiones = comparar_con_baseline(actual, baseline, args.tolerancia)
+        for r in regresiones:
+            if "error" in r:
+                print(f"REGRESIÓN {r['caso']}: {r['baseline_us']} us/op -> error ({r['error']})")
+            else:
+                print(f"REGRESIÓN {r['caso']}: {r['baseline_us']} -> {r['actual_us']} us/op (x{r['razon']})")
+        codigo = 1 if regresiones else 0
+    if args.guardar_baseline:
+        with open(args.baseline or "benchmark_baseline.json", "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2)
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+import re
+import unicodedata
+from typing import Dict, List, Any, Optional, Set, Iterable, Tuple, Union
+
+UMBRAL_NOMBRE = 0.85
+SIMILITUD_FONETICA = 0.9
+LIMITE_BLOQUE = 50
+
+# Normalización
+
+def quitar_acentos(texto: str) -> str:
+    """Elimina tildes y diéresis conservando la ñ como n"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+def normalizar_nombre(nombre: str) -> str:
+    """Minúsculas, sin acentos ni signos, con un solo espacio entre palabras"""
+    nombre = quitar_acentos(nombre.lower())
+    return ' '.join(re.sub(r'[^a-z\s]', ' ', nombre).split())
+
+def normalizar_correo(correo: str) -> str:
+    """Minúsculas y sin el sufijo +etiqueta de la parte local"""
+    correo = correo.strip().lower()
+    local, arroba, dominio = correo.partition('@')
+    if not arroba:
+        return correo
+    return f"{local.split('+', 1)[0]}@{dominio}"
+
+def normalizar_telefono(telefono: str) -> str:
+    """Solo dígitos, conservando los 9 últimos para ignorar prefijos de país"""
+    return re.sub(r'\D', '', telefono)[-9:]
+
+# Reglas fonéticas para español, aplicadas en orden
+_REGLAS_FONETICAS = tuple((re.compile(patron), reemplazo) for patron, reemplazo in (
+    (r'ph', 'f'), (r'qu', 'k'), (r'ch', 'X'), (r'll', 'y'),
+    (r'c(?=[ei])', 's'), (r'g(?=[ei])', 'j'), (r'gu(?=[ei])', 'g'),
+    (r'z', 's'), (r'c', 'k'), (r'q', 'k'), (r'v', 'b'), (r'w', 'b'),
+    (r'h', ''), (r'x', 'ks'), (r'i', 'y'),
+))
+_VOCALES = re.compile(r'[aeiouy]')
+
+def clave_fonetica_palabra(palabra: str) -> str:
+    """
+    Código fonético de una palabra: aplica las reglas de pronunciación,
+    conserva la primera letra y elimina vocales y letras repetidas
+    """
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        palabra = patron.sub(reemplazo, palabra)
+    if not palabra:
+        return ''
+    cuerpo = _VOCALES.sub('', palabra[1:])
+    clave = palabra[0]
+    for c in cuerpo:
+        if c != clave[-1]:
+            clave += c
+    return clave
+
+def clave_fonetica(nombre: str) -> str:
+    """Código fonético del nombre completo, independiente del orden de las palabras"""
+    return ' '.join(sorted(clave_fonetica_palabra(p) for p in normalizar_nombre(nombre).split()))
+
+def distancia_edicion(a: str, b: str, maximo: Optional[int] = None) -> int:
+    """
+    Distancia de Levenshtein entre dos cadenas
+    Args:
+        maximo: Si se indica, solo se calcula la banda de ancho `maximo` alrededor
+            de la diagonal y cualquier distancia mayor se reporta como maximo + 1
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if maximo is None:
+        maximo = len(a)
+    if len(a) - len(b) > maximo:
+        return maximo + 1
+    fuera = maximo + 1
+    anterior = [j if j <= maximo else fuera for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, start=1):
+        desde, hasta = max(1, i - maximo), min(len(b), i + maximo)
+        actual = [fuera] * (len(b) + 1)
+        if i <= maximo:
+            actual[0] = i
+        mejor = actual[0]
+        for j in range(desde, hasta + 1):
+            valor = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != b[j - 1]))
+            actual[j] = valor
+            if valor < mejor:
+                mejor = valor
+        if mejor > maximo:
+            return fuera
+        anterior = actual
+    return min(anterior[-1], fuera)
+
+def _ordenar_palabras(nombre: str) -> str:
+    return ' '.join(sorted(nombre.split()))
+
+def similitud_nombre(a: str, b: str, minimo: float = 0.0) -> float:
+    """
+    Similitud entre 0 y 1 de dos nombres normalizados, sin importar el orden de las palabras
+    Args:
+        minimo: Si el resultado quedaría por debajo, se puede cortar antes y retornar 0
+    """
+    a, b = _ordenar_palabras(a), _ordenar_palabras(b)
+    largo = max(len(a), len(b))
+    if not largo:
+        return 0.0
+    maximo = int(largo * (1 - minimo)) if minimo else None
+    distancia = distancia_edicion(a, b, maximo)
+    if maximo is not None and distancia > maximo:
+        return 0.0
+    return 1 - distancia / largo
+
+class IndiceDuplicados:
+    """
+    Índice por bloques para detectar usuarios posiblemente duplicados.
+    Cada usuario se ubica en bloques por correo, teléfono y código fonético
+    del nombre (más sus variantes con una letra borrada, para tolerar errores
+    de tipeo). Una búsqueda solo compara contra los usuarios de sus bloques,
+    y los bloques con más de limite_bloque usuarios no se recorren.
+    Un bloque de nombre saturado ya no se consulta, así que de él solo se
+    cuenta cuántos usuarios tiene; sigue saturado hasta vaciarse. Los de
+    correo y teléfono guardan siempre sus usuarios.
+    """
+    def __init__(self, umbral_nombre: float = UMBRAL_NOMBRE, limite_bloque: int = LIMITE_BLOQUE):
+        self.umbral_nombre = umbral_nombre
+        self.limite_bloque = limite_bloque
+        # Conjunto de IDs, o solo la cantidad en los bloques de nombre saturados
+        self._bloques: Dict[Tuple[str, str], Union[Set[str], int]] = {}
+        # Datos con los que se indexó cada usuario; las claves se regeneran al quitarlo
+        # en lugar de guardar una docena de claves por usuario
+        self._datos: Dict[str, Tuple[str, str, str]] = {}
+        self._nombres: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def _generar_claves(self, nombre: str, correo: str, telefono: str) -> List[Tuple[str, str]]:
+        claves = []
+        correo = normalizar_correo(correo)
+        if '@' in correo:
+            claves.append(('correo', correo))
+        telefono = normalizar_telefono(telefono)
+        if len(telefono) >= 7:
+            claves.append(('telefono', telefono))
+        fonetica = clave_fonetica(nombre)
+        if fonetica:
+            compacta = fonetica.replace(' ', '')
+            claves.append(('nombre', compacta))
+            if len(compacta) > 3:
+                # La clave completa también va en 'nombre~' para que una letra de más o de menos
+                # coincida con alguna variante del otro nombre
+                claves.append(('nombre~', compacta))
+                claves.extend(('nombre~', compacta[:i] + compacta[i + 1:]) for i in range(len(compacta)))
+        return list(dict.fromkeys(claves))
+
+    def agregar(self, usuario, claves: Optional[List[Tuple[str, str]]] = None) -> None:
+        """Agrega un usuario al índice"""
+        if claves is None:
+            claves = self._generar_claves(usuario.nombre, usuario.correo, usuario.telefono)
+        self._datos[usuario.id_usuario] = (usuario.nombre, usuario.correo, usuario.telefono)
+        self._nombres[usuario.id_usuario] = normalizar_nombre(usuario.nombre)
+        bloques, limite = self._bloques, self.limite_bloque
+        for clave in claves:
+            bloque = bloques.get(clave)
+            if bloque is None:
+                bloques[clave] = {usuario.id_usuario}
+            elif type(bloque) is int:
+                bloques[clave] = bloque + 1
+            else:
+                bloque.add(usuario.id_usuario)
+                if len(bloque) > limite and clave[0][0] == 'n':
+                    bloques[clave] = len(bloque)
+
+    def eliminar(self, id_usuario: str) -> None:
+        """Quita un usuario del índice"""
+        datos = self._datos.pop(id_usuario, None)
+        for clave in self._generar_claves(*datos) if datos else ():
+            bloque = self._bloques.get(clave)
+            if type(bloque) is int:
+                if bloque > 1:
+                    self._bloques[clave] = bloque - 1
+                else:
+                    del self._bloques[clave]
+            elif bloque is not None:
+                bloque.discard(id_usuario)
+                if not bloque:
+                    del self._bloques[clave]
+        self._nombres.pop(id_usuario, None)
+
+    def buscar(self, nombre: str, correo: str, telefono: str,
+               excluir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Busca usuarios que probablemente sean la misma persona
+        Returns:
+            Lista de dicts con id_usuario, puntaje (0 a 1) y motivos, de mayor a menor puntaje
+        """
+        return self._buscar_por_claves(normalizar_nombre(nombre),
+                                       self._generar_claves(nombre, correo, telefono), excluir)
+
+    def _buscar_por_claves(self, nombre_normalizado: str, claves: List[Tuple[str, str]],
+                           excluir: Optional[str]) -> List[Dict[str, Any]]:
+        motivos: Dict[str, Set[str]] = {}
+        saturados = []
+        for tipo, valor in claves:
+            bloque = self._bloques.get((tipo, valor))
+            if not bloque or type(bloque) is int:
+                continue
+            if len(bloque) > self.limite_bloque:
+                # Un nombre común no aporta información; un correo o teléfono compartido por
+                # muchos (p. ej. el de una empresa) solo se usa para los candidatos de otros bloques
+                if tipo[0] != 'n':
+                    saturados.append((tipo, bloque))
+                continue
+            for id_candidato in bloque:
+                razones = motivos.get(id_candidato)
+                if razones is None:
+                    motivos[id_candidato] = {tipo}
+                else:
+                    razones.add(tipo)
+        for tipo, bloque in saturados:
+            for id_candidato, razones in motivos.items():
+                if id_candidato in bloque:
+                    razones.add(tipo)
+        motivos.pop(excluir, None)
+
+        resultados = []
+        # Los nombres comunes se repiten mucho dentro de un bloque: se compara cada nombre distinto una vez
+        similitudes: Dict[Tuple[str, float], float] = {}
+        for id_candidato, razones in motivos.items():
+            # Solo con coincidencia de teléfono interesa una similitud menor al umbral
+            minimo = 0.5 if 'telefono' in razones else self.umbral_nombre
+            clave = (self._nombres[id_candidato], minimo)
+            similitud = similitudes.get(clave)
+            if similitud is None:
+                similitud = similitudes[clave] = similitud_nombre(nombre_normalizado, clave[0], minimo)
+            # Nombres que suenan igual se consideran parecidos aunque se escriban distinto
+            if 'nombre' in razones:
+                similitud = max(similitud, SIMILITUD_FONETICA)
+            razones = {r.rstrip('~') for r in razones}
+            if 'correo' in razones:
+                puntaje = 1.0
+            elif 'telefono' in razones:
+                puntaje = 0.9 if similitud >= 0.5 else 0.7
+            elif similitud >= self.umbral_nombre:
+                puntaje = round(similitud * 0.8, 3)
+            else:
+                continue
+            if similitud >= self.umbral_nombre:
+                razones.add('nombre')
+            else:
+                razones.discard('nombre')
+            resultados.append({'id_usuario': id_candidato, 'puntaje': puntaje, 'motivos': sorted(razones)})
+        resultados.sort(key=lambda r: (-r['puntaje'], r['id_usuario']))
+        return resultados
+
+    def bloques_saturados(self, correo: str, telefono: str) -> Dict[str, int]:
+        """
+        Correo y teléfono compartidos por más de limite_bloque usuarios, con la
+        cantidad de usuarios de cada uno. Esos usuarios no se comparan uno a uno.
+        """
+        resultado = {}
+        for tipo, valor in self._generar_claves('', correo, telefono):
+            tamano = len(self._bloques.get((tipo, valor), ()))
+            if tamano > self.limite_bloque:
+                resultado[tipo] = tamano
+        return resultado
+
+    def posibles_duplicados(self, usuario) -> List[Dict[str, Any]]:
+        """Busca posibles duplicados de un usuario (excluyéndolo a él mismo)"""
+        return self.buscar(usuario.nombre, usuario.correo, usuario.telefono, excluir=usuario.id_usuario)
+
+    def registrar(self, usuario) -> List[Dict[str, Any]]:
+        """Busca posibles duplicados de un usuario nuevo y luego lo agrega al índice"""
+        claves = self._generar_claves(usuario.nombre, usuario.correo, usuario.telefono)
+        candidatos = self._buscar_por_claves(normalizar_nombre(usuario.nombre), claves, usuario.id_usuario)
+        self.agregar(usuario, claves)
+        return candidatos
+
+def detectar_duplicados(usuarios: Iterable, puntaje_minimo: float = 0.7,
+                        indice: Optional[IndiceDuplicados] = None) -> List[List[str]]:
+    """
+    Agrupa los usuarios que parecen ser la misma persona
+    Args:
+        usuarios: Usuarios a revisar (p. ej. gimnasio.usuarios.values())
+        puntaje_minimo: Puntaje desde el cual dos usuarios se consideran duplicados
+        indice: Índice ya construido con esos usuarios; si es None se construye uno
+    Returns:
+        Grupos de IDs con más de un usuario, ordenados
+    """
+    usuarios = list(usuarios)
+    if indice is None:
+        indice = IndiceDuplicados()
+        for usuario in usuarios:
+            indice.agregar(usuario)
+
+    # Unión de conjuntos para juntar pares transitivamente
+    padre: Dict[str, str] = {}
+    def raiz(x: str) -> str:
+        while padre.get(x, x) != x:
+            padre[x] = padre.get(padre[x], padre[x])
+            x = padre[x]
+        return x
+
+    for usuario in usuarios:
+        for candidato in indice.posibles_duplicados(usuario):
+            if candidato['puntaje'] >= puntaje_minimo:
+                a, b = raiz(usuario.id_usuario), raiz(candidato['id_usuario'])
+                if a != b:
+                    padre[max(a, b)] = min(a, b)
+
+    grupos: Dict[str, List[str]] = {}
+    for usuario in usuarios:
+        grupos.setdefault(raiz(usuario.id_usuario), []).append(usuario.id_usuario)
+    return sorted(sorted(g) for g in grupos.values() if len(g) > 1)
@@ -0,0 +1,226 @@
+import threading
+from datetime import datetime, date
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+# Eventos emitidos por Gimnasio y Usuario
+
+class UsuarioAgregado(NamedTuple):
+    id_usuario: str
+    nombre: str
+    correo: str
+    momento: datetime
+
+class UsuarioEliminado(NamedTuple):
+    id_usuario: str
+    momento: datetime
+
+class IngresoRegistrado(NamedTuple):
+    id_usuario: str
+    fecha: date
+    hora_ingreso: datetime
+    hora_salida: Optional[datetime]
+    tiempo_entrenamiento: float
+    momento: datetime
+
+class IngresoAnulado(NamedTuple):
+    id_usuario: str
+    hora_ingreso: datetime
+    momento: datetime
+
+class MedidasRegistradas(NamedTuple):
+    id_usuario: str
+    peso: float
+    altura: float
+    imc: float
+    momento: datetime
+
+class MedidaEditada(NamedTuple):
+    id_usuario: str
+    indice: int
+    peso: float
+    altura: float
+    imc: float
+    momento: datetime
+
+class MedidaEliminada(NamedTuple):
+    id_usuario: str
+    indice: int
+    momento: datetime
+
+class MembresiaCambiada(NamedTuple):
+    id_usuario: str
+    anterior: str
+    nueva: str
+    momento: datetime
+
+# Políticas ante un suscriptor que no alcanza a consumir
+BLOQUEAR = 'bloquear'
+DESCARTAR = 'descartar'
+
+class BusEventos:
+    """
+    Bus de publicación/suscripción en memoria.
+    Los eventos quedan en un buffer circular con offsets crecientes, de modo que
+    cada suscriptor avanza con su propio cursor y puede volver a leer cualquier
+    evento que siga retenido.
+    """
+    def __init__(self, retencion: int = 100_000):
+        if retencion <= 0:
+            raise ValueError("La retención debe ser positiva")
+        self.retencion = retencion
+        self._buffer: List[Any] = [None] * retencion
+        self._siguiente = 0
+        self._condicion = threading.Condition()
+        self._suscripciones: List['Suscripcion'] = []
+
+    @property
+    def primer_offset(self) -> int:
+        """Offset del evento retenido más antiguo"""
+        return max(0, self._siguiente - self.retencion)
+
+    @property
+    def siguiente_offset(self) -> int:
+        """Offset que recibirá el próximo evento publicado"""
+        return self._siguiente
+
+    def publicar(self, evento: Any) -> int:
+        """
+        Publica un evento
+        Si un suscriptor con política 'bloquear' tiene su cola llena, espera
+        hasta que consuma o venza su tiempo de espera; si vence, o la política
+        es 'descartar', el suscriptor pierde los eventos más antiguos.
+        Returns:
+            Offset asignado al evento
+        """
+        with self._condicion:
+            for suscripcion in self._suscripciones:
+                if suscripcion.pendientes() >= suscripcion.capacidad:
+                    # Si ya se esperó en vano, no se vuelve a esperar hasta que el suscriptor lea
+                    if suscripcion.politica == BLOQUEAR and not suscripcion._saturada:
+                        self._condicion.wait_for(
+                            lambda: suscripcion.pendientes() < suscripcion.capacidad or not suscripcion.activa,
+                            timeout=suscripcion.espera_maxima)
+                    if suscripcion.pendientes() >= suscripcion.capacidad:
+                        suscripcion._saturada = True
+                        suscripcion._descartar_antiguos()
+            offset = self._siguiente
+            self._buffer[offset % self.retencion] = evento
+            self._siguiente += 1
+            self._condicion.notify_all()
+            return offset
+
+    def leer_desde(self, offset: int, maximo: int) -> List[Tuple[int, Any]]:
+        """
+        Lee eventos retenidos a partir de un offset
+        Raises:
+            ValueError: Si el offset ya no está retenido
+        """
+        with self._condicion:
+            return self._leer(offset, maximo)
+
+    def _leer(self, offset: int, maximo: int) -> List[Tuple[int, Any]]:
+        if offset < self.primer_offset:
+            raise ValueError(f"El offset {offset} ya no está retenido (primero: {self.primer_offset})")
+        hasta = min(self._siguiente, offset + maximo)
+        return [(i, self._buffer[i % self.retencion]) for i in range(offset, hasta)]
+
+    def suscribir(self, desde: Optional[int] = None, capacidad: int = 10_000, tamano_lote: int = 500,
+                  politica: str = BLOQUEAR, espera_maxima: float = 1.0) -> 'Suscripcion':
+        """
+        Crea una suscripción
+        Args:
+            desde: Offset inicial; por defecto solo recibe eventos nuevos
+            capacidad: Máximo de eventos pendientes antes de aplicar contrapresión
+            tamano_lote: Máximo de eventos entregados por lectura
+            politica: 'bloquear' (frena al publicador) o 'descartar' (pierde los más antiguos)
+            espera_maxima: Segundos que el publicador espera con la política 'bloquear'
+        """
+        if politica not in (BLOQUEAR, DESCARTAR):
+            raise ValueError(f"Política desconocida: {politica}")
+        with self._condicion:
+            suscripcion = Suscripcion(self, self._siguiente if desde is None else desde,
+                                      min(capacidad, self.retencion), tamano_lote, politica, espera_maxima)
+            self._suscripciones.append(suscripcion)
+            return suscripcion
+
+    def cancelar(self, suscripcion: 'Suscripcion') -> None:
+        """Elimina una suscripción y libera a un publicador que la esté esperando"""
+        with self._condicion:
+            suscripcion.activa = False
+            if suscripcion in self._suscripciones:
+                self._suscripciones.remove(suscripcion)
+            self._condicion.notify_all()
+
+class Suscripcion:
+    """Cursor de lectura de un suscriptor sobre el bus"""
+    def __init__(self, bus: BusEventos, cursor: int, capacidad: int, tamano_lote: int,
+                 politica: str, espera_maxima: float):
+        self.bus = bus
+        self.cursor = cursor
+        self.capacidad = capacidad
+        self.tamano_lote = tamano_lote
+        self.politica = politica
+        self.espera_maxima = espera_maxima
+        self.activa = True
+        self.perdidos = 0
+        self._saturada = False
+        self._hilo: Optional[threading.Thread] = None
+
+    def pendientes(self) -> int:
+        """Eventos publicados que este suscriptor aún no leyó"""
+        return self.bus._siguiente - self.cursor
+
+    def _descartar_antiguos(self) -> None:
+        # Se llama con el lock del bus tomado; deja espacio para un evento más
+        nuevo_cursor = self.bus._siguiente - self.capacidad + 1
+        if nuevo_cursor > self.cursor:
+            self.perdidos += nuevo_cursor - self.cursor
+            self.cursor = nuevo_cursor
+
+    def leer(self, espera: Optional[float] = 0) -> List[Tuple[int, Any]]:
+        """
+        Lee el siguiente lote de eventos y avanza el cursor
+        Args:
+            espera: Segundos a esperar si no hay eventos (None espera indefinidamente)
+        Returns:
+            Lista de pares (offset, evento), como máximo tamano_lote
+        """
+        with self.bus._condicion:
+            if espera != 0:
+                self.bus._condicion.wait_for(lambda: self.pendientes() > 0 or not self.activa, timeout=espera)
+            if self.cursor < self.bus.primer_offset:
+                self.perdidos += self.bus.primer_offset - self.cursor
+                self.cursor = self.bus.primer_offset
+            lote = self.bus._leer(self.cursor, self.tamano_lote)
+            self.cursor += len(lote)
+            self._saturada = False
+            # Despierta al publicador si estaba esperando que se liberara espacio
+            self.bus._condicion.notify_all()
+            return lote
+
+    def posicionar(self, offset: int) -> None:
+        """Mueve el cursor para volver a leer (o saltar) eventos"""
+        with self.bus._condicion:
+            if offset < self.bus.primer_offset or offset > self.bus._siguiente:
+                raise ValueError(f"Offset fuera de rango: {offset}")
+            self.cursor = offset
+
+    def iniciar(self, manejador: Callable[[List[Tuple[int, Any]]], None], intervalo: float = 0.5) -> None:
+        """
+        Entrega los eventos en lotes a `manejador` desde un hilo en segundo plano.
+        Un manejador lento recibe lotes más grandes en lugar de frenar cada publicación.
+        """
+        def ciclo():
+            while self.activa:
+                lote = self.leer(espera=intervalo)
+                if lote:
+                    manejador(lote)
+        self._hilo = threading.Thread(target=ciclo, daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera: float = 5.0) -> None:
+        """Cancela la suscripción y espera a que termine el hilo de entrega"""
+        self.bus.cancelar(self)
+        if self._hilo is not None:
+            self._hilo.join(espera)
+            self._hilo = None
@@ -1,16 +1,27 @@
 import logging
 import re
+import time
+import metricas
 from typing import Any, Dict, Callable
 from functools import wraps
 from datetime import datetime
 
-# Configuración del logging
-logging.basicConfig(
-    filename='gimnasio.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
+# Sin configuración explícita los errores no se escriben en ningún lado
+logger.addHandler(logging.NullHandler())
+
+def configurar_logging(archivo: str = 'gimnasio.log', nivel: int = logging.INFO) -> None:
+    """
+    Configura el logging del sistema hacia un archivo
+    Args:
+        archivo: Ruta del archivo de log
+        nivel: Nivel mínimo de los mensajes registrados
+    """
+    logging.basicConfig(
+        filename=archivo,
+        level=nivel,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
 class GimnasioError(Exception):
     """Clase base para excepciones del gimnasio"""
@@ -128,9 +139,10 @@ def handle_exception(func: Callable) -> Callable:
     """
     @wraps(func)
     def wrapper(*args, **kwargs) -> Dict[str, Any]:
+        inicio = time.perf_counter() if metricas.habilitado else None
         try:
             resultado = func(*args, **kwargs)
-            return {
+            respuesta = {
                 "error": False,
                 "resultado": resultado,
                 "mensaje": "Operación exitosa"
@@ -138,16 +150,20 @@ def handle_exception(func: Callable) -> Callable:
         except (UsuarioError, MembresiaError, DatosInvalidosError, 
                 ReporteError, AsistenciaError, MedidasError) as e:
             logger.error(f"{e.__class__.__name__}: {str(e)}")
-            return {
+            respuesta = {
                 "error": True,
                 "tipo_error": e.__class__.__name__,
                 "mensaje": str(e)
             }
         except Exception as e:
             logger.critical(f"Error inesperado: {str(e)}", exc_info=True)
-            return {
+            respuesta = {
                 "error": True,
                 "tipo_error": "Error interno",
                 "mensaje": "Error interno del sistema"
             }
+        if inicio is not None:
+            metricas.registrar(func.__qualname__, time.perf_counter() - inicio,
+                               respuesta.get("tipo_error"))
+        return respuesta
     return wrapper
\ No newline at end of file
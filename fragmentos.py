@@ -0,0 +1,218 @@
+import zlib
+import multiprocessing
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
+from models import Usuario, Gimnasio
+from agregados import AgregadoMensual, agregado_mensual
+from exceptions import GimnasioError
+
+def particion_por_hash(id_usuario: str, fragmentos: int) -> int:
+    """Fragmento dueño de un usuario según el hash estable de su ID"""
+    return zlib.crc32(id_usuario.encode('utf-8')) % fragmentos
+
+# Operaciones que atiende cada proceso trabajador sobre su propio Gimnasio
+
+def _agregar_usuarios(gimnasio: Gimnasio, usuarios: List[Usuario]) -> int:
+    for usuario in usuarios:
+        gimnasio.agregar_usuario(usuario)
+    return len(usuarios)
+
+def _registrar_ingresos(gimnasio: Gimnasio, registros: List[Tuple]) -> List[Tuple[int, str]]:
+    errores = gimnasio.registrar_ingresos_lote(registro for _, registro in registros)
+    return [(registros[i][0], mensaje) for i, mensaje in errores]
+
+def _en_usuario(gimnasio: Gimnasio, id_usuario: str, metodo: str, args: Tuple) -> Any:
+    return getattr(gimnasio.obtener_usuario(id_usuario), metodo)(*args)
+
+def _agregado_mensual(gimnasio: Gimnasio, mes: int, anio: int) -> AgregadoMensual:
+    return agregado_mensual(gimnasio.usuarios.values(), mes, anio)
+
+_OPERACIONES: Dict[str, Callable[..., Any]] = {
+    'agregar_usuarios': _agregar_usuarios,
+    'registrar_ingresos': _registrar_ingresos,
+    'en_usuario': _en_usuario,
+    'agregado_mensual': _agregado_mensual,
+    'agregar_usuario': Gimnasio.agregar_usuario,
+    'obtener_usuario': Gimnasio.obtener_usuario,
+    'eliminar_usuario': Gimnasio.eliminar_usuario,
+    'registrar_ingreso': Gimnasio.registrar_ingreso,
+    'buscar_usuarios': Gimnasio.buscar_usuarios,
+    'usuarios_presentes': Gimnasio.usuarios_presentes,
+    'obtener_estadisticas': Gimnasio.obtener_estadisticas,
+}
+
+def _trabajador(conexion) -> None:
+    gimnasio = Gimnasio()
+    while True:
+        mensaje = conexion.recv()
+        if mensaje is None:
+            break
+        operacion, args = mensaje
+        try:
+            conexion.send(('ok', _OPERACIONES[operacion](gimnasio, *args)))
+        except Exception as e:
+            conexion.send(('error', e.__class__.__name__, str(e)))
+    conexion.close()
+
+class GimnasioDistribuido:
+    """
+    Fachada que reparte los usuarios entre varios procesos, cada uno con su
+    propio Gimnasio. Las operaciones sobre un usuario van solo al fragmento
+    dueño; búsquedas y estadísticas se envían a todos a la vez y se combinan.
+    """
+    def __init__(self, fragmentos: int = 4, particion: Optional[Callable[[str, int], int]] = None):
+        """
+        Args:
+            fragmentos: Cantidad de procesos trabajadores
+            particion: Función (id_usuario, fragmentos) -> índice de fragmento; por
+                defecto hash del ID. Permite, por ejemplo, asignar por sucursal.
+        """
+        if fragmentos < 1:
+            raise ValueError("Debe haber al menos un fragmento")
+        self.fragmentos = fragmentos
+        self.particion = particion or particion_por_hash
+        self._conexiones = []
+        self._procesos = []
+        for _ in range(fragmentos):
+            local, remota = multiprocessing.Pipe()
+            proceso = multiprocessing.Process(target=_trabajador, args=(remota,), daemon=True)
+            proceso.start()
+            remota.close()
+            self._conexiones.append(local)
+            self._procesos.append(proceso)
+
+    def __enter__(self) -> 'GimnasioDistribuido':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        """Detiene los procesos trabajadores"""
+        for conexion in self._conexiones:
+            try:
+                conexion.send(None)
+                conexion.close()
+            except (OSError, BrokenPipeError):
+                pass
+        for proceso in self._procesos:
+            proceso.join(5)
+        self._conexiones, self._procesos = [], []
+
+    def fragmento_de(self, id_usuario: str) -> int:
+        """Índice del fragmento dueño de un usuario"""
+        return self.particion(id_usuario, self.fragmentos)
+
+    # Comunicación con los trabajadores
+
+    @staticmethod
+    def _respuesta(conexion) -> Any:
+        respuesta = conexion.recv()
+        if respuesta[0] == 'ok':
+            return respuesta[1]
+        _, tipo, mensaje = respuesta
+        if tipo in ('ValueError', 'KeyError', 'TypeError'):
+            raise {'ValueError': ValueError, 'KeyError': KeyError, 'TypeError': TypeError}[tipo](mensaje)
+        raise GimnasioError(f"{tipo}: {mensaje}")
+
+    def _llamar(self, fragmento: int, operacion: str, *args) -> Any:
+        conexion = self._conexiones[fragmento]
+        conexion.send((operacion, args))
+        return self._respuesta(conexion)
+
+    def _dispersar(self, operacion: str, args_por_fragmento: Dict[int, Tuple]) -> Dict[int, Any]:
+        # Primero se envía a todos para que trabajen en paralelo, luego se recogen
+        for fragmento, args in args_por_fragmento.items():
+            self._conexiones[fragmento].send((operacion, args))
+        resultados, error = {}, None
+        for fragmento in args_por_fragmento:
+            try:
+                resultados[fragmento] = self._respuesta(self._conexiones[fragmento])
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return resultados
+
+    def _a_todos(self, operacion: str, *args) -> List[Any]:
+        resultados = self._dispersar(operacion, {f: args for f in range(self.fragmentos)})
+        return [resultados[f] for f in range(self.fragmentos)]
+
+    # Operaciones por usuario
+
+    def agregar_usuario(self, usuario: Usuario) -> List[Dict[str, Any]]:
+        """Agrega un usuario en su fragmento (los duplicados se buscan dentro de ese fragmento)"""
+        return self._llamar(self.fragmento_de(usuario.id_usuario), 'agregar_usuario', usuario)
+
+    def agregar_usuarios(self, usuarios: Iterable[Usuario]) -> int:
+        """Agrega muchos usuarios enviando un solo mensaje por fragmento"""
+        grupos: Dict[int, List[Usuario]] = {}
+        for usuario in usuarios:
+            grupos.setdefault(self.fragmento_de(usuario.id_usuario), []).append(usuario)
+        return sum(self._dispersar('agregar_usuarios', {f: (g,) for f, g in grupos.items()}).values())
+
+    def obtener_usuario(self, id_usuario: str) -> Usuario:
+        """Retorna una copia del usuario tal como está en su fragmento"""
+        return self._llamar(self.fragmento_de(id_usuario), 'obtener_usuario', id_usuario)
+
+    def eliminar_usuario(self, id_usuario: str) -> None:
+        """Elimina un usuario de su fragmento"""
+        self._llamar(self.fragmento_de(id_usuario), 'eliminar_usuario', id_usuario)
+
+    def registrar_ingreso(self, id_usuario: str, fecha, hora_ingreso, hora_salida=None) -> None:
+        """Registra un ingreso en el fragmento dueño del usuario"""
+        self._llamar(self.fragmento_de(id_usuario), 'registrar_ingreso',
+                     id_usuario, fecha, hora_ingreso, hora_salida)
+
+    def registrar_ingresos(self, registros: Iterable[Tuple]) -> List[Tuple[int, str]]:
+        """
+        Registra muchos ingresos (id_usuario, fecha, hora_ingreso, hora_salida) en paralelo
+        Returns:
+            Pares (posición, mensaje) de los registros rechazados
+        """
+        grupos: Dict[int, List[Tuple[int, Tuple]]] = {}
+        for posicion, registro in enumerate(registros):
+            grupos.setdefault(self.fragmento_de(registro[0]), []).append((posicion, tuple(registro)))
+        resultados = self._dispersar('registrar_ingresos', {f: (g,) for f, g in grupos.items()})
+        return sorted(error for errores in resultados.values() for error in errores)
+
+    def registrar_medidas(self, id_usuario: str, peso: float, altura: float) -> None:
+        """Registra medidas en el fragmento dueño del usuario"""
+        self._llamar(self.fragmento_de(id_usuario), 'en_usuario', id_usuario, 'registrar_medidas', (peso, altura))
+
+    def congelar_membresia(self, id_usuario: str) -> None:
+        """Congela la membresía en el fragmento dueño del usuario"""
+        self._llamar(self.fragmento_de(id_usuario), 'en_usuario', id_usuario, 'congelar_membresia', ())
+
+    def activar_membresia(self, id_usuario: str) -> None:
+        """Activa la membresía en el fragmento dueño del usuario"""
+        self._llamar(self.fragmento_de(id_usuario), 'en_usuario', id_usuario, 'activar_membresia', ())
+
+    # Operaciones sobre todos los fragmentos
+
+    def buscar_usuarios(self, criterio: str, valor: str) -> List[Usuario]:
+        """Busca en todos los fragmentos en paralelo y junta los resultados"""
+        return [usuario for resultados in self._a_todos('buscar_usuarios', criterio, valor)
+                for usuario in resultados]
+
+    def usuarios_presentes(self, desde, hasta) -> List[str]:
+        """Consulta el índice de asistencias de todos los fragmentos en paralelo"""
+        return sorted(id_usuario for ids in self._a_todos('usuarios_presentes', desde, hasta) for id_usuario in ids)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Combina las estadísticas de todos los fragmentos"""
+        parciales = self._a_todos('obtener_estadisticas')
+        return {
+            'total_usuarios': sum(p['total_usuarios'] for p in parciales),
+            'usuarios_activos': sum(p['usuarios_activos'] for p in parciales),
+            'usuarios_congelados': sum(p['usuarios_congelados'] for p in parciales),
+            'fecha_inicio': min(p['fecha_inicio'] for p in parciales),
+            'usuarios_por_fragmento': [p['total_usuarios'] for p in parciales]
+        }
+
+    def agregado_mensual(self, mes: int, anio: int) -> AgregadoMensual:
+        """Cada fragmento agrega sus usuarios en paralelo y se combinan los parciales"""
+        parciales = self._a_todos('agregado_mensual', mes, anio)
+        total = AgregadoMensual(mes, anio)
+        for parcial in parciales:
+            total.combinar(parcial)
+        return total
@@ -1,7 +1,15 @@
-import tkinter as tk
-from tkinter import messagebox
 from datetime import datetime
-from fpdf import FPDF
+
+# tkinter y fpdf se importan solo cuando se abre la interfaz o se genera un reporte
+tk = None
+messagebox = None
+
+def _cargar_tkinter():
+    global tk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as _messagebox
+        tk, messagebox = tkinter, _messagebox
 
 # Excepciones personalizadas
 class GimnasioError(Exception):
@@ -64,25 +72,46 @@ class Gimnasio:
             raise UsuarioNoEncontradoError("Usuario no encontrado.")
         return usuario
 
-class ReportePDF(FPDF):
-    def header(self):
-        self.set_font("Arial", "B", 12)
-        self.cell(0, 10, "Reporte del Gimnasio", 0, 1, "C")
-
-    def generar_reporte_usuario(self, usuario):
-        self.add_page()
-        self.set_font("Arial", "", 12)
-        self.cell(0, 10, f"ID de Usuario: {usuario.user_id}", 0, 1)
-        self.cell(0, 10, f"Nombre: {usuario.nombre}", 0, 1)
-        self.cell(0, 10, f"Edad: {usuario.edad}", 0, 1)
-        self.cell(0, 10, f"Estado de Membresía: {usuario.estado_membresia()}", 0, 1)
-        self.cell(0, 10, f"Asistencias: {len(usuario.asistencias)}", 0, 1)
-        for medida in usuario.medidas:
-            self.cell(0, 10, f"- Peso: {medida['peso']} kg, Altura: {medida['altura']} m", 0, 1)
+_ReportePDF = None
+
+def _clase_reporte_pdf():
+    """Define ReportePDF la primera vez que se necesita"""
+    global _ReportePDF
+    if _ReportePDF is not None:
+        return _ReportePDF
+    from fpdf import FPDF
+    from reportes import dibujar_tabla
+
+    class ReportePDF(FPDF):
+        def header(self):
+            self.set_font("Arial", "B", 12)
+            self.cell(0, 10, "Reporte del Gimnasio", 0, 1, "C")
+
+        def generar_reporte_usuario(self, usuario):
+            self.add_page()
+            self.set_font("Arial", "", 12)
+            self.cell(0, 10, f"ID de Usuario: {usuario.user_id}", 0, 1)
+            self.cell(0, 10, f"Nombre: {usuario.nombre}", 0, 1)
+            self.cell(0, 10, f"Edad: {usuario.edad}", 0, 1)
+            self.cell(0, 10, f"Estado de Membresía: {usuario.estado_membresia()}", 0, 1)
+            self.cell(0, 10, f"Asistencias: {len(usuario.asistencias)}", 0, 1)
+            # Con historiales largos la tabla se pagina y se limita a MAX_FILAS filas
+            dibujar_tabla(self, ["Peso (kg)", "Altura (m)"], [60, 60],
+                          ((medida['peso'], medida['altura']) for medida in usuario.medidas))
+
+    _ReportePDF = ReportePDF
+    return ReportePDF
+
+def __getattr__(nombre):
+    # Permite seguir usando gui.ReportePDF desde fuera del módulo
+    if nombre == 'ReportePDF':
+        return _clase_reporte_pdf()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 # Interfaz gráfica con Tkinter
 class GimnasioApp:
     def __init__(self, root):
+        _cargar_tkinter()
         self.root = root
         self.gimnasio = Gimnasio()
         
@@ -316,7 +345,7 @@ class GimnasioApp:
                 return
             try:
                 usuario = self.gimnasio.obtener_usuario(user_id)
-                pdf = ReportePDF()
+                pdf = _clase_reporte_pdf()()
                 pdf.generar_reporte_usuario(usuario)
                 pdf_file_name = f"reporte_{user_id}.pdf"
                 pdf.output(pdf_file_name)
@@ -327,6 +356,7 @@ class GimnasioApp:
             self.entry_id.config(state="disabled")
 
 if __name__ == "__main__":
+    _cargar_tkinter()
     root = tk.Tk()
     app = GimnasioApp(root)
     root.mainloop()
@@ -0,0 +1,71 @@
+from typing import Dict, List, Any, Optional
+
+VENTANA_PROMEDIO = 5
+
+# Límites superiores de cada categoría de IMC (OMS)
+CATEGORIAS_IMC = ((18.5, "Bajo peso"), (25.0, "Normal"), (30.0, "Sobrepeso"))
+
+def categoria_imc(imc: float) -> str:
+    """Categoría de la OMS correspondiente a un IMC"""
+    for limite, categoria in CATEGORIAS_IMC:
+        if imc < limite:
+            return categoria
+    return "Obesidad"
+
+class IndicadoresMedidas:
+    """
+    Caché de los indicadores derivados de las medidas de un usuario: categoría
+    de IMC, variación respecto de la medida anterior y promedio móvil.
+    Los indicadores se calculan al consultarlos y solo para las medidas que
+    todavía no tienen, así que una medida nueva cuesta O(1). Editar o eliminar
+    la medida i invalida desde i en adelante. Si la lista de medidas cambia
+    por fuera (por ejemplo, al cargar un usuario guardado) se reconstruye.
+    """
+    def __init__(self, ventana: int = VENTANA_PROMEDIO):
+        if ventana < 1:
+            raise ValueError("La ventana del promedio debe ser al menos 1")
+        self.ventana = ventana
+        self._medidas: Optional[List[Dict[str, Any]]] = None
+        self._indicadores: List[Dict[str, Any]] = []
+        # Sumas acumuladas de IMC: _sumas[i] es la suma de las primeras i medidas
+        self._sumas: List[float] = [0.0]
+
+    def invalidar_desde(self, indice: int) -> None:
+        """Descarta los indicadores de la medida `indice` en adelante"""
+        indice = max(indice, 0)
+        del self._indicadores[indice:]
+        del self._sumas[indice + 1:]
+
+    def _sincronizar(self, medidas: List[Dict[str, Any]]) -> None:
+        calculados = len(self._indicadores)
+        if (medidas is not self._medidas or calculados > len(medidas)
+                or (calculados and self._indicadores[-1]['medida'] is not medidas[calculados - 1])):
+            self._medidas = medidas
+            self.invalidar_desde(0)
+            calculados = 0
+        ventana, sumas = self.ventana, self._sumas
+        for i in range(calculados, len(medidas)):
+            medida = medidas[i]
+            imc = medida['imc']
+            sumas.append(sumas[-1] + imc)
+            desde = max(0, i + 1 - ventana)
+            self._indicadores.append({
+                'medida': medida,
+                'imc': imc,
+                'categoria': categoria_imc(imc),
+                'variacion_imc': round(imc - medidas[i - 1]['imc'], 2) if i else None,
+                'variacion_peso': round(medida['peso'] - medidas[i - 1]['peso'], 2) if i else None,
+                'promedio_imc': round((sumas[i + 1] - sumas[desde]) / (i + 1 - desde), 2),
+            })
+
+    def obtener(self, medidas: List[Dict[str, Any]], indice: int = -1) -> Optional[Dict[str, Any]]:
+        """Indicadores de una medida (por defecto la última), o None si no hay medidas"""
+        if not medidas:
+            return None
+        self._sincronizar(medidas)
+        return self._indicadores[indice]
+
+    def todos(self, medidas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Indicadores de todas las medidas, en el mismo orden"""
+        self._sincronizar(medidas)
+        return list(self._indicadores)
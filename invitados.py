@@ -0,0 +1,77 @@
+import heapq
+from datetime import datetime, timedelta, date
+from itertools import count
+from typing import Dict, Any, Optional, List, Tuple
+
+class RegistroInvitados:
+    """
+    Registro liviano de visitas de invitados, separado de los usuarios.
+    Las visitas se descartan al cumplir su tiempo de vida (ttl); los conteos
+    por día se conservan.
+    """
+    def __init__(self, ttl: timedelta = timedelta(days=30)):
+        self.ttl = ttl
+        self._visitas: Dict[str, Dict[str, Any]] = {}
+        # Montículo (hora_ingreso, número, id) para descartar primero las visitas más antiguas,
+        # aunque se hayan registrado con una hora anterior a otras ya cargadas
+        self._orden: List[Tuple[datetime, int, str]] = []
+        self._secuencia = count(1)
+        self._conteo_por_dia: Dict[date, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._visitas)
+
+    def registrar(self, nombre: str, anfitrion: Optional[str] = None,
+                  hora_ingreso: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Registra la visita de un invitado
+        Args:
+            nombre: Nombre del invitado
+            anfitrion: ID del usuario que lo invita, si aplica
+            hora_ingreso: Momento de la visita (por defecto ahora)
+        Returns:
+            La visita registrada, con su id_invitado
+        """
+        hora_ingreso = hora_ingreso or datetime.now()
+        self.depurar(hora_ingreso)
+        # El contador nunca retrocede, así que los IDs no se repiten aunque se descarten visitas
+        numero = next(self._secuencia)
+        visita = {
+            'id_invitado': f"invitado_{numero}",
+            'nombre': nombre,
+            'anfitrion': anfitrion,
+            'hora_ingreso': hora_ingreso,
+        }
+        self._visitas[visita['id_invitado']] = visita
+        heapq.heappush(self._orden, (hora_ingreso, numero, visita['id_invitado']))
+        dia = hora_ingreso.date()
+        self._conteo_por_dia[dia] = self._conteo_por_dia.get(dia, 0) + 1
+        return visita
+
+    def obtener(self, id_invitado: str) -> Optional[Dict[str, Any]]:
+        """Retorna una visita vigente, o None si no existe o ya venció"""
+        visita = self._visitas.get(id_invitado)
+        if visita is None or visita['hora_ingreso'] + self.ttl <= datetime.now():
+            return None
+        return visita
+
+    def depurar(self, ahora: Optional[datetime] = None) -> int:
+        """
+        Descarta las visitas vencidas
+        Returns:
+            Cantidad de visitas descartadas
+        """
+        limite = (ahora or datetime.now()) - self.ttl
+        descartadas = 0
+        while self._orden and self._orden[0][0] <= limite:
+            del self._visitas[heapq.heappop(self._orden)[2]]
+            descartadas += 1
+        return descartadas
+
+    def conteo_dia(self, dia: date) -> int:
+        """Cantidad de invitados registrados en un día"""
+        return self._conteo_por_dia.get(dia, 0)
+
+    def conteos_por_dia(self, desde: date, hasta: date) -> Dict[date, int]:
+        """Cantidad de invitados por día entre dos fechas (inclusive)"""
+        return {dia: n for dia, n in self._conteo_por_dia.items() if desde <= dia <= hasta}
@@ -1,8 +1,17 @@
 import sys
+import csv
+import json
+import time
+import argparse
+import shutil
 from datetime import datetime
-from fpdf import FPDF
+from typing import Dict, List, Any, Optional, Iterator, Union
+import metricas
 from models import Usuario, Gimnasio
+from reportes import MotorReportes
+from agregados import agregado_mensual, exportar_csv, exportar_pdf
 from exceptions import (
+    configurar_logging,
     handle_exception, 
     UsuarioNoEncontradoError, 
     validar_datos_usuario, 
@@ -10,8 +19,11 @@ from exceptions import (
 )
 
 class Console:
-    def __init__(self):
-        self.gimnasio = Gimnasio()
+    def __init__(self, gimnasio: Optional[Gimnasio] = None):
+        self.gimnasio = gimnasio if gimnasio is not None else Gimnasio()
+        self.reportes = MotorReportes()
+        # Posibles duplicados encontrados por el lote en curso (ver ejecutar_lote)
+        self._duplicados_lote: List[Dict[str, Any]] = []
         self.opciones = {
             "1": self.registrar_usuario,
             "2": self.registrar_medidas,
@@ -20,7 +32,8 @@ class Console:
             "5": self.generar_reporte,
             "6": self.congelar_membresia,
             "7": self.activar_membresia,
-            "8": self.salir
+            "8": self.salir,
+            "9": self.generar_reporte_general
         }
 
     def mostrar_menu(self):
@@ -33,6 +46,7 @@ class Console:
         print("6. Congelar membresía")
         print("7. Activar membresía")
         print("8. Salir")
+        print("9. Generar reporte general")
 
     def ejecutar(self):
         while True:
@@ -53,10 +67,17 @@ class Console:
         direccion = input("Dirección: ")
         telefono = input("Teléfono: ")
         
+        posibles_duplicados = self._registrar_usuario(id_usuario, nombre, correo, direccion, telefono)
+        print("Usuario registrado exitosamente.")
+        for candidato in posibles_duplicados:
+            existente = self.gimnasio.obtener_usuario(candidato['id_usuario'])
+            print(f"Aviso: posible duplicado de {existente.id_usuario} ({existente.nombre}), "
+                  f"coincide en {', '.join(candidato['motivos'])}")
+
+    def _registrar_usuario(self, id_usuario, nombre, correo, direccion, telefono):
         validar_datos_usuario(nombre, correo, telefono)
         nuevo_usuario = Usuario(id_usuario, nombre, correo, direccion, telefono)
-        self.gimnasio.agregar_usuario(nuevo_usuario)
-        print("Usuario registrado exitosamente.")
+        return self.gimnasio.agregar_usuario(nuevo_usuario)
 
     @handle_exception
     def registrar_medidas(self):
@@ -65,10 +86,19 @@ class Console:
         peso = float(input("Peso (kg): "))
         altura = float(input("Altura (m): "))
         
+        usuario = self._registrar_medidas(id_usuario, peso, altura)
+        print("Medidas registradas exitosamente.")
+        indicadores = usuario.obtener_indicadores()
+        print(f"IMC: {indicadores['imc']} ({indicadores['categoria']}), "
+              f"promedio de las últimas medidas: {indicadores['promedio_imc']}")
+        if indicadores['variacion_imc'] is not None:
+            print(f"Variación respecto de la medida anterior: {indicadores['variacion_imc']:+.2f}")
+
+    def _registrar_medidas(self, id_usuario, peso, altura):
         validar_medidas(peso, altura)
         usuario = self.gimnasio.obtener_usuario(id_usuario)
         usuario.registrar_medidas(peso, altura)
-        print("Medidas registradas exitosamente.")
+        return usuario
 
     @handle_exception
     def registrar_asistencia(self):
@@ -77,7 +107,7 @@ class Console:
         hora_ingreso = datetime.now()
         hora_salida_str = input("Hora de salida (HH:MM) o presione Enter si aún no sale: ")
         
-        usuario = self.gimnasio.obtener_usuario(id_usuario)
+        self.gimnasio.obtener_usuario(id_usuario)
         if hora_salida_str:
             try:
                 hora, minuto = map(int, hora_salida_str.split(':'))
@@ -86,9 +116,12 @@ class Console:
                 raise ValueError("Formato de hora inválido. Use HH:MM")
         else:
             hora_salida = None
-        self.gimnasio.registrar_ingreso(id_usuario, datetime.now().date(), hora_ingreso, hora_salida)
+        self._registrar_asistencia(id_usuario, hora_ingreso, hora_salida)
         print("Asistencia registrada exitosamente.")
 
+    def _registrar_asistencia(self, id_usuario, hora_ingreso, hora_salida=None):
+        self.gimnasio.registrar_ingreso(id_usuario, hora_ingreso.date(), hora_ingreso, hora_salida)
+
     @handle_exception
     def ver_estado_membresia(self):
         print("\n--- Estado de Membresía ---")
@@ -107,50 +140,216 @@ class Console:
         self._generar_reporte_pdf(usuario, mes, anio)
 
     def _generar_reporte_pdf(self, usuario, mes, anio):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-        pdf.set_font('DejaVu', '', 12)
-        
-        pdf.cell(200, 10, txt="Reporte de Actividad", ln=True, align='C')
-        pdf.cell(200, 10, txt=f"Usuario: {usuario.nombre}", ln=True)
-        pdf.cell(200, 10, txt=f"Mes: {mes}, Año: {anio}", ln=True)
-        
-        asistencias = [a for a in usuario.registro_ingreso if a['fecha'].month == mes and a['fecha'].year == anio]
-        pdf.cell(200, 10, txt=f"Total de asistencias: {len(asistencias)}", ln=True)
-        
-        for asistencia in asistencias:
-            pdf.cell(200, 10, txt=f"Fecha: {asistencia['fecha'].strftime('%d/%m/%Y')}", ln=True)
-            pdf.cell(200, 10, txt=f"Hora de ingreso: {asistencia['hora_ingreso'].strftime('%H:%M')}", ln=True)
-            if asistencia['hora_salida']:
-                pdf.cell(200, 10, txt=f"Hora de salida: {asistencia['hora_salida'].strftime('%H:%M')}", ln=True)
-            pdf.cell(200, 10, txt=f"Tiempo de entrenamiento: {asistencia['tiempo_entrenamiento']:.2f} minutos", ln=True)
-            pdf.cell(200, 10, txt="--------------------", ln=True)
-        
+        ruta = self.reportes.reporte_actividad(usuario, mes, anio)
         filename = f"reporte_{usuario.id_usuario}_{mes}_{anio}.pdf"
-        pdf.output(filename)
+        shutil.copyfile(ruta, filename)
         print(f"Reporte generado: {filename}")
 
+    @handle_exception
+    def generar_reporte_general(self):
+        print("\n--- Reporte General del Gimnasio ---")
+        mes = int(input("Mes (1-12): "))
+        anio = int(input("Año: "))
+        archivos = self._generar_reporte_general(mes, anio)
+        print(f"Reporte generado: {', '.join(archivos)}")
+
+    def _generar_reporte_general(self, mes, anio):
+        agregado = agregado_mensual(self.gimnasio.usuarios.values(), mes, anio)
+        nombre = f"reporte_general_{mes}_{anio}"
+        exportar_csv(agregado, f"{nombre}.csv")
+        exportar_pdf(agregado, f"{nombre}.pdf")
+        return [f"{nombre}.csv", f"{nombre}.pdf"]
+
     @handle_exception
     def congelar_membresia(self):
         print("\n--- Congelar Membresía ---")
         id_usuario = input("ID de usuario: ")
-        usuario = self.gimnasio.obtener_usuario(id_usuario)
-        usuario.congelar_membresia()
+        self._congelar_membresia(id_usuario)
         print("Membresía congelada exitosamente.")
 
+    def _congelar_membresia(self, id_usuario):
+        self.gimnasio.obtener_usuario(id_usuario).congelar_membresia()
+
     @handle_exception
     def activar_membresia(self):
         print("\n--- Activar Membresía ---")
         id_usuario = input("ID de usuario: ")
-        usuario = self.gimnasio.obtener_usuario(id_usuario)
-        usuario.activar_membresia()
+        self._activar_membresia(id_usuario)
         print("Membresía activada exitosamente.")
 
+    def _activar_membresia(self, id_usuario):
+        self.gimnasio.obtener_usuario(id_usuario).activar_membresia()
+
+    def ejecutar_lote(self, operaciones, atomico: bool = True) -> Dict[str, Any]:
+        """
+        Ejecuta una secuencia de operaciones sin interacción
+        Args:
+            operaciones: Iterable de diccionarios con la clave 'op' y los datos de la operación,
+                o de líneas JSON con esos diccionarios (se interpretan aquí, para que una
+                línea mal formada cuente como una operación fallida)
+            atomico: Si es True, ante el primer error se deshacen todas las operaciones aplicadas
+        Returns:
+            Resumen del lote
+        """
+        deshacer = []
+        por_operacion: Dict[str, int] = {}
+        errores: List[Dict[str, Any]] = []
+        self._duplicados_lote = []
+        total = 0
+        completo = False
+        inicio = time.perf_counter()
+        iterador = iter(operaciones)
+        try:
+            while True:
+                try:
+                    operacion = next(iterador)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    # Error al leer el origen (archivo, CSV mal formado...): no se puede seguir leyendo
+                    errores.append({'linea': total + 1, 'op': '', 'tipo_error': e.__class__.__name__,
+                                    'mensaje': str(e)})
+                    break
+                total += 1
+                nombre = ''
+                inicio_op = time.perf_counter() if metricas.habilitado else None
+                tipo_error = None
+                try:
+                    if isinstance(operacion, str):
+                        operacion = json.loads(operacion)
+                    if not isinstance(operacion, dict):
+                        raise TypeError("Cada operación debe ser un objeto con la clave 'op'")
+                    nombre = operacion.get('op', '')
+                    if nombre not in OPERACIONES_LOTE:
+                        raise ValueError(f"Operación desconocida: {nombre!r}")
+                    deshacer.append(getattr(self, f"_lote_{nombre}")(operacion))
+                    por_operacion[nombre] = por_operacion.get(nombre, 0) + 1
+                except Exception as e:
+                    tipo_error = e.__class__.__name__
+                    errores.append({'linea': total, 'op': str(nombre), 'tipo_error': tipo_error,
+                                    'mensaje': str(e)})
+                if inicio_op is not None:
+                    metricas.registrar(f"lote.{nombre}", time.perf_counter() - inicio_op, tipo_error)
+                if errores and atomico:
+                    break
+            completo = True
+        finally:
+            # También se revierte si algo interrumpe el lote (p. ej. KeyboardInterrupt)
+            revertido = atomico and (bool(errores) or not completo)
+            if revertido:
+                for funcion in reversed(deshacer):
+                    funcion()
+        duracion = time.perf_counter() - inicio
+        return {
+            'total': total,
+            'exitosas': 0 if revertido else len(deshacer),
+            'fallidas': len(errores),
+            'revertido': revertido,
+            'por_operacion': {} if revertido else por_operacion,
+            'errores': errores,
+            # Los usuarios de un lote revertido ya no existen
+            'posibles_duplicados': [] if revertido else self._duplicados_lote,
+            'segundos': round(duracion, 6),
+            'operaciones_por_segundo': round(total / duracion) if duracion else None
+        }
+
+    # Cada _lote_* aplica una operación y retorna la función que la deshace
+
+    def _lote_registrar_usuario(self, op):
+        posibles_duplicados = self._registrar_usuario(op['id_usuario'], op['nombre'], op['correo'],
+                                                      op.get('direccion', ''), op['telefono'])
+        if posibles_duplicados:
+            self._duplicados_lote.append({'id_usuario': op['id_usuario'],
+                                          'duplicado_de': [c['id_usuario'] for c in posibles_duplicados]})
+        return lambda: self.gimnasio.eliminar_usuario(op['id_usuario'])
+
+    def _lote_registrar_medidas(self, op):
+        usuario = self._registrar_medidas(op['id_usuario'], float(op['peso']), float(op['altura']))
+        return lambda: usuario.eliminar_medida()
+
+    def _lote_registrar_asistencia(self, op):
+        hora_ingreso = _leer_fecha(op.get('hora_ingreso')) or datetime.now()
+        self._registrar_asistencia(op['id_usuario'], hora_ingreso, _leer_fecha(op.get('hora_salida')))
+        return lambda: self.gimnasio.anular_ingreso(op['id_usuario'])
+
+    def _lote_congelar_membresia(self, op):
+        self._congelar_membresia(op['id_usuario'])
+        usuario = self.gimnasio.obtener_usuario(op['id_usuario'])
+        return usuario.activar_membresia
+
+    def _lote_activar_membresia(self, op):
+        self._activar_membresia(op['id_usuario'])
+        usuario = self.gimnasio.obtener_usuario(op['id_usuario'])
+        return usuario.congelar_membresia
+
     def salir(self):
         print("Gracias por usar el Sistema de Gestión de Gimnasio. ¡Hasta pronto!")
         sys.exit(0)
 
-if __name__ == "__main__":
+OPERACIONES_LOTE = ('registrar_usuario', 'registrar_medidas', 'registrar_asistencia',
+                   'congelar_membresia', 'activar_membresia')
+
+def _leer_fecha(valor: Optional[str]) -> Optional[datetime]:
+    if not valor:
+        return None
+    return datetime.fromisoformat(valor)
+
+def leer_operaciones(ruta: str, formato: Optional[str] = None) -> Iterator[Union[Dict[str, Any], str]]:
+    """
+    Lee operaciones de un archivo JSONL (un objeto por línea, que se entrega como texto)
+    o CSV (con encabezado, entregadas como diccionarios)
+    Args:
+        ruta: Archivo de operaciones, o '-' para la entrada estándar
+        formato: 'jsonl' o 'csv'; si es None se deduce de la extensión
+    """
+    if formato is None:
+        formato = 'csv' if ruta.lower().endswith('.csv') else 'jsonl'
+    archivo = sys.stdin if ruta == '-' else open(ruta, encoding='utf-8', newline='')
+    try:
+        if formato == 'csv':
+            for fila in csv.DictReader(archivo):
+                yield {clave: valor for clave, valor in fila.items() if valor not in (None, '')}
+        else:
+            # Cada línea se interpreta en Console.ejecutar_lote, que registra las inválidas como fallidas
+            for linea in archivo:
+                if linea.strip():
+                    yield linea
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sistema de Gestión de Gimnasio")
+    parser.add_argument("--lote", metavar="ARCHIVO",
+                        help="Ejecuta las operaciones del archivo (JSONL o CSV, '-' para stdin) sin menú")
+    parser.add_argument("--formato", choices=['jsonl', 'csv'])
+    parser.add_argument("--continuar", action="store_true",
+                        help="No revierte el lote ante errores; aplica las operaciones válidas")
+    parser.add_argument("--resumen", metavar="ARCHIVO", help="Guarda el resumen del lote en JSON")
+    args = parser.parse_args(argv)
+
+    configurar_logging()
+    metricas.configurar_desde_entorno()
     console = Console()
-    console.ejecutar()
\ No newline at end of file
+    if not args.lote:
+        console.ejecutar()
+        return 0
+
+    resumen = console.ejecutar_lote(leer_operaciones(args.lote, args.formato), atomico=not args.continuar)
+    print(f"Operaciones: {resumen['total']}  exitosas: {resumen['exitosas']}  "
+          f"fallidas: {resumen['fallidas']}  ({resumen['operaciones_por_segundo']} ops/s)")
+    for operacion, cantidad in resumen['por_operacion'].items():
+        print(f"  {operacion}: {cantidad}")
+    for error in resumen['errores'][:20]:
+        print(f"  línea {error['linea']} ({error['op']}): {error['tipo_error']} - {error['mensaje']}")
+    if resumen['posibles_duplicados']:
+        print(f"  Posibles duplicados: {len(resumen['posibles_duplicados'])} usuarios (ver --resumen)")
+    if resumen['revertido']:
+        print("El lote se revirtió por completo.")
+    if args.resumen:
+        with open(args.resumen, 'w', encoding='utf-8') as archivo:
+            json.dump(resumen, archivo, indent=2, ensure_ascii=False)
+    return 1 if resumen['fallidas'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
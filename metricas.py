@@ -0,0 +1,198 @@
+import os
+import atexit
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+# Interruptor global. handle_exception lo consulta en cada llamada; con la
+# instrumentación apagada ese es todo el costo (una lectura de atributo).
+habilitado = False
+
+# Límites (en segundos) de los buckets del histograma de latencias
+BUCKETS: Tuple[float, ...] = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Histograma:
+    """Histograma acumulativo de latencias al estilo Prometheus"""
+    def __init__(self, limites: Tuple[float, ...] = BUCKETS):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        """Agrega una observación al histograma"""
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        else:
+            self.conteos[-1] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """Retorna pares (limite, conteo acumulado), terminando en +Inf"""
+        acumulado = 0
+        for limite, conteo in zip(self.limites + (float('inf'),), self.conteos):
+            acumulado += conteo
+            yield limite, acumulado
+
+class RegistroMetricas:
+    """Guarda contadores y latencias por operación"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        """Borra todas las métricas acumuladas"""
+        with self._lock:
+            self.llamadas: Dict[str, int] = defaultdict(int)
+            self.errores: Dict[Tuple[str, str], int] = defaultdict(int)
+            self.latencias: Dict[str, Histograma] = {}
+
+    def registrar(self, operacion: str, segundos: float, tipo_error: Optional[str] = None) -> None:
+        """Registra una llamada a una operación"""
+        with self._lock:
+            self.llamadas[operacion] += 1
+            if tipo_error:
+                self.errores[(operacion, tipo_error)] += 1
+            histograma = self.latencias.get(operacion)
+            if histograma is None:
+                histograma = self.latencias[operacion] = Histograma()
+            histograma.observar(segundos)
+
+    def exportar_prometheus(self) -> str:
+        """Retorna las métricas en formato de texto de Prometheus"""
+        lineas = [
+            "# HELP gimnasio_operaciones_total Llamadas por operación",
+            "# TYPE gimnasio_operaciones_total counter",
+        ]
+        with self._lock:
+            for operacion, conteo in sorted(self.llamadas.items()):
+                lineas.append(f'gimnasio_operaciones_total{{operacion="{operacion}"}} {conteo}')
+            lineas += [
+                "# HELP gimnasio_errores_total Errores por operación y tipo_error",
+                "# TYPE gimnasio_errores_total counter",
+            ]
+            for (operacion, tipo_error), conteo in sorted(self.errores.items()):
+                lineas.append(f'gimnasio_errores_total{{operacion="{operacion}",'
+                              f'tipo_error="{tipo_error}"}} {conteo}')
+            lineas += [
+                "# HELP gimnasio_latencia_segundos Latencia por operación",
+                "# TYPE gimnasio_latencia_segundos histogram",
+            ]
+            for operacion, histograma in sorted(self.latencias.items()):
+                for limite, acumulado in histograma.acumulados():
+                    le = "+Inf" if limite == float('inf') else repr(limite)
+                    lineas.append(f'gimnasio_latencia_segundos_bucket{{operacion="{operacion}",'
+                                  f'le="{le}"}} {acumulado}')
+                lineas.append(f'gimnasio_latencia_segundos_sum{{operacion="{operacion}"}} {histograma.suma}')
+                lineas.append(f'gimnasio_latencia_segundos_count{{operacion="{operacion}"}} {histograma.total}')
+        return "\n".join(lineas) + "\n"
+
+registro = RegistroMetricas()
+
+def habilitar() -> None:
+    """Activa la instrumentación de handle_exception"""
+    global habilitado
+    habilitado = True
+
+def deshabilitar() -> None:
+    """Desactiva la instrumentación de handle_exception"""
+    global habilitado
+    habilitado = False
+
+def registrar(operacion: str, segundos: float, tipo_error: Optional[str] = None) -> None:
+    """Registra una llamada en el registro global"""
+    registro.registrar(operacion, segundos, tipo_error)
+
+def exportar_prometheus() -> str:
+    """Retorna las métricas globales en formato Prometheus"""
+    return registro.exportar_prometheus()
+
+def volcar(archivo: str) -> None:
+    """Escribe las métricas globales en un archivo de texto Prometheus"""
+    with open(archivo, "w", encoding="utf-8") as f:
+        f.write(registro.exportar_prometheus())
+
+def servir(puerto: int, host: str = "127.0.0.1") -> Any:
+    """
+    Expone las métricas en http://host:puerto/metrics desde un hilo en segundo plano
+    Returns:
+        El servidor HTTP, para poder detenerlo con shutdown()
+    """
+    # http.server es costoso de importar; solo se carga si se pide el endpoint
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            cuerpo = registro.exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, format, *args):
+            pass
+
+    servidor = HTTPServer((host, puerto), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+# Perfilado bajo demanda
+
+_perfilador = None
+
+def iniciar_perfilado() -> None:
+    """Empieza a perfilar con cProfile"""
+    global _perfilador
+    if _perfilador is None:
+        import cProfile
+        _perfilador = cProfile.Profile()
+        _perfilador.enable()
+
+def detener_perfilado(archivo: Optional[str] = None, limite: int = 25) -> str:
+    """
+    Detiene el perfilado
+    Args:
+        archivo: Si se indica, guarda las estadísticas crudas (formato pstats)
+        limite: Cantidad de funciones a incluir en el resumen
+    Returns:
+        Resumen de las funciones con mayor tiempo acumulado
+    """
+    global _perfilador
+    if _perfilador is None:
+        return ""
+    import io
+    import pstats
+    _perfilador.disable()
+    if archivo:
+        _perfilador.dump_stats(archivo)
+    salida = io.StringIO()
+    pstats.Stats(_perfilador, stream=salida).sort_stats("cumulative").print_stats(limite)
+    _perfilador = None
+    return salida.getvalue()
+
+def configurar_desde_entorno() -> None:
+    """
+    Activa la instrumentación según variables de entorno:
+        GIMNASIO_METRICAS: archivo donde volcar las métricas al salir
+        GIMNASIO_METRICAS_PUERTO: puerto para exponer /metrics por HTTP
+        GIMNASIO_PERFIL: archivo donde guardar el perfil de cProfile al salir
+    """
+    archivo = os.environ.get("GIMNASIO_METRICAS")
+    puerto = os.environ.get("GIMNASIO_METRICAS_PUERTO")
+    perfil = os.environ.get("GIMNASIO_PERFIL")
+    if archivo or puerto:
+        habilitar()
+    if archivo:
+        atexit.register(volcar, archivo)
+    if puerto:
+        servir(int(puerto))
+    if perfil:
+        iniciar_perfilado()
+        atexit.register(detener_perfilado, perfil)
@@ -1,6 +1,12 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterable, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from duplicados import IndiceDuplicados
+from invitados import RegistroInvitados
+from asistencias import IndiceAsistencias
+from indicadores import IndicadoresMedidas
+from eventos import (BusEventos, UsuarioAgregado, UsuarioEliminado, IngresoRegistrado,
+                     IngresoAnulado, MedidasRegistradas, MedidaEditada, MedidaEliminada,
+                     MembresiaCambiada)
 
 class Usuario:
     """Clase que representa un usuario del gimnasio"""
@@ -17,6 +23,11 @@ class Usuario:
         self.tiempo_entrenamiento_total: float = 0
         self.fecha_registro = datetime.now()
         self.ultima_actualizacion = datetime.now()
+        # Bus de eventos del gimnasio al que pertenece (lo asigna Gimnasio.agregar_usuario)
+        self.bus: Optional[BusEventos] = None
+        # Contador de cambios de ingresos por (año, mes), usado por la caché de reportes
+        self.versiones_mes: Dict[Tuple[int, int], int] = {}
+        self._indicadores: Optional[IndicadoresMedidas] = None
 
     def registrar_medidas(self, peso: float, altura: float) -> None:
         """Registra las medidas del usuario"""
@@ -32,12 +43,51 @@ class Usuario:
         }
         self.medidas.append(medida)
         self.ultima_actualizacion = datetime.now()
+        if self.bus is not None:
+            self.bus.publicar(MedidasRegistradas(self.id_usuario, peso, altura, medida['imc'], medida['fecha']))
+
+    def editar_medida(self, indice: int, peso: float, altura: float) -> Dict[str, Any]:
+        """Corrige el peso y la altura de una medida registrada y la retorna"""
+        if not self.medidas:
+            raise ValueError("El usuario no tiene medidas registradas")
+        if peso <= 0 or altura <= 0:
+            raise ValueError("El peso y la altura deben ser valores positivos")
+        if not -len(self.medidas) <= indice < len(self.medidas):
+            raise IndexError(f"No existe la medida {indice}")
+        if indice < 0:
+            indice += len(self.medidas)
+        medida = dict(self.medidas[indice], peso=peso, altura=altura, imc=round(peso / (altura ** 2), 2))
+        self.medidas[indice] = medida
+        self.indicadores.invalidar_desde(indice)
+        self.ultima_actualizacion = datetime.now()
+        if self.bus is not None:
+            self.bus.publicar(MedidaEditada(self.id_usuario, indice, peso, altura, medida['imc'],
+                                            self.ultima_actualizacion))
+        return medida
+
+    def eliminar_medida(self, indice: int = -1) -> Dict[str, Any]:
+        """Elimina una medida registrada (por defecto la última) y la retorna"""
+        if not self.medidas:
+            raise ValueError("El usuario no tiene medidas registradas")
+        if not -len(self.medidas) <= indice < len(self.medidas):
+            raise IndexError(f"No existe la medida {indice}")
+        if indice < 0:
+            indice += len(self.medidas)
+        medida = self.medidas.pop(indice)
+        self.indicadores.invalidar_desde(indice)
+        self.ultima_actualizacion = datetime.now()
+        if self.bus is not None:
+            self.bus.publicar(MedidaEliminada(self.id_usuario, indice, self.ultima_actualizacion))
+        return medida
 
     def congelar_membresia(self) -> None:
         """Congela la membresía del usuario"""
         if self.membresia == "Activa":
             self.membresia = "Congelada"
             self.ultima_actualizacion = datetime.now()
+            if self.bus is not None:
+                self.bus.publicar(MembresiaCambiada(self.id_usuario, "Activa", "Congelada",
+                                                    self.ultima_actualizacion))
         else:
             raise ValueError("La membresía no se puede congelar porque no está activa")
 
@@ -46,6 +96,9 @@ class Usuario:
         if self.membresia == "Congelada":
             self.membresia = "Activa"
             self.ultima_actualizacion = datetime.now()
+            if self.bus is not None:
+                self.bus.publicar(MembresiaCambiada(self.id_usuario, "Congelada", "Activa",
+                                                    self.ultima_actualizacion))
         else:
             raise ValueError("La membresía ya está activa o no se puede activar")
 
@@ -59,6 +112,29 @@ class Usuario:
             return self.medidas[-1]
         return None
 
+    @property
+    def indicadores(self) -> IndicadoresMedidas:
+        # getattr cubre usuarios guardados antes de que existiera la caché
+        if getattr(self, '_indicadores', None) is None:
+            self._indicadores = IndicadoresMedidas()
+        return self._indicadores
+
+    def obtener_indicadores(self, indice: int = -1) -> Optional[Dict[str, Any]]:
+        """
+        Indicadores derivados de una medida (por defecto la última): imc, categoria,
+        variacion_imc, variacion_peso y promedio_imc; None si no hay medidas
+        """
+        return self.indicadores.obtener(self.medidas, indice)
+
+    def version_mes(self, anio: int, mes: int) -> int:
+        """Versión de los ingresos de un mes; cambia cada vez que se agrega o anula uno"""
+        return self.versiones_mes.get((anio, mes), 0)
+
+    def marcar_cambio_ingresos(self, fecha) -> None:
+        """Registra que cambiaron los ingresos del mes de `fecha`"""
+        clave = (fecha.year, fecha.month)
+        self.versiones_mes[clave] = self.versiones_mes.get(clave, 0) + 1
+
     def calcular_tiempo_total_entrenamiento(self) -> float:
         """Calcula el tiempo total de entrenamiento en minutos"""
         return sum(registro['tiempo_entrenamiento'] for registro in self.registro_ingreso)
@@ -80,15 +156,32 @@ class Usuario:
 
 class Gimnasio:
     """Clase que gestiona el gimnasio"""
-    def __init__(self):
+    def __init__(self, bus: Optional[BusEventos] = None):
         self.usuarios: Dict[str, Usuario] = {}
+        # Si hay bus, cada cambio publica un evento para los sistemas que lo consumen
+        self.bus = bus
         self.fecha_inicio = datetime.now()
+        self.indice_duplicados = IndiceDuplicados()
+        # Los invitados se guardan aparte para no mezclarlos con los usuarios
+        self.invitados = RegistroInvitados()
+        # Asistencias de todos los usuarios ordenadas por hora, para consultas por rango
+        self.indice_asistencias = IndiceAsistencias()
 
-    def agregar_usuario(self, usuario: Usuario) -> None:
-        """Agrega un usuario al gimnasio"""
+    def agregar_usuario(self, usuario: Usuario) -> List[Dict[str, Any]]:
+        """
+        Agrega un usuario al gimnasio
+        Returns:
+            Usuarios existentes que probablemente sean la misma persona
+        """
         if usuario.id_usuario in self.usuarios:
             raise ValueError(f"El usuario con ID {usuario.id_usuario} ya existe")
         self.usuarios[usuario.id_usuario] = usuario
+        posibles_duplicados = self.indice_duplicados.registrar(usuario)
+        usuario.bus = self.bus
+        if self.bus is not None:
+            self.bus.publicar(UsuarioAgregado(usuario.id_usuario, usuario.nombre, usuario.correo,
+                                              datetime.now()))
+        return posibles_duplicados
 
     def obtener_usuario(self, id_usuario: str) -> Usuario:
         """Obtiene un usuario por su ID"""
@@ -101,11 +194,46 @@ class Gimnasio:
         """Elimina un usuario del gimnasio"""
         if id_usuario not in self.usuarios:
             raise ValueError(f"Usuario con ID {id_usuario} no encontrado")
-        del self.usuarios[id_usuario]
+        usuario = self.usuarios.pop(id_usuario)
+        self.indice_duplicados.eliminar(id_usuario)
+        self.indice_asistencias.eliminar_usuario(
+            id_usuario, [(r['hora_ingreso'], id_usuario, r['hora_salida']) for r in usuario.registro_ingreso])
+        usuario.bus = None
+        if self.bus is not None:
+            self.bus.publicar(UsuarioEliminado(id_usuario, datetime.now()))
 
     def registrar_ingreso(self, id_usuario: str, fecha: datetime, 
                          hora_ingreso: datetime, hora_salida: Optional[datetime] = None) -> None:
         """Registra el ingreso y salida de un usuario"""
+        self._agregar_ingreso(id_usuario, fecha, hora_ingreso, hora_salida)
+        self.indice_asistencias.agregar(id_usuario, hora_ingreso, hora_salida)
+
+    def registrar_ingresos_lote(self, registros: Iterable[Tuple]) -> List[Tuple[int, str]]:
+        """
+        Registra muchos ingresos (id_usuario, fecha, hora_ingreso, hora_salida) de una vez.
+        Los rechazados, también por errores inesperados (p. ej. horas con y sin
+        zona horaria), no detienen el lote. El índice de asistencias se
+        actualiza una sola vez al final, aunque algo corte el recorrido.
+        Returns:
+            Pares (posición, mensaje) de los registros rechazados
+        """
+        errores = []
+        aceptados = []
+        try:
+            for posicion, (id_usuario, fecha, hora_ingreso, hora_salida) in enumerate(registros):
+                try:
+                    self._agregar_ingreso(id_usuario, fecha, hora_ingreso, hora_salida)
+                except Exception as e:
+                    errores.append((posicion, str(e)))
+                else:
+                    aceptados.append((hora_ingreso, id_usuario, hora_salida))
+        finally:
+            self.indice_asistencias.agregar_varias(aceptados)
+        return errores
+
+    def _agregar_ingreso(self, id_usuario: str, fecha: datetime,
+                         hora_ingreso: datetime, hora_salida: Optional[datetime]) -> None:
+        # Todo menos el índice de asistencias, que se actualiza aparte para los lotes
         usuario = self.obtener_usuario(id_usuario)
         
         if usuario.membresia != "Activa":
@@ -126,6 +254,23 @@ class Gimnasio:
         
         usuario.registro_ingreso.append(registro)
         usuario.tiempo_entrenamiento_total += tiempo_entrenamiento
+        usuario.marcar_cambio_ingresos(fecha)
+        if self.bus is not None:
+            self.bus.publicar(IngresoRegistrado(id_usuario, fecha, hora_ingreso, hora_salida,
+                                                tiempo_entrenamiento, datetime.now()))
+
+    def anular_ingreso(self, id_usuario: str) -> Dict[str, Any]:
+        """Anula el último ingreso registrado de un usuario y lo retorna"""
+        usuario = self.obtener_usuario(id_usuario)
+        if not usuario.registro_ingreso:
+            raise ValueError(f"El usuario con ID {id_usuario} no tiene ingresos registrados")
+        registro = usuario.registro_ingreso.pop()
+        usuario.tiempo_entrenamiento_total -= registro['tiempo_entrenamiento']
+        usuario.marcar_cambio_ingresos(registro['fecha'])
+        self.indice_asistencias.eliminar(id_usuario, registro['hora_ingreso'], registro['hora_salida'])
+        if self.bus is not None:
+            self.bus.publicar(IngresoAnulado(id_usuario, registro['hora_ingreso'], datetime.now()))
+        return registro
 
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """Obtiene estadísticas generales del gimnasio"""
@@ -140,6 +285,12 @@ class Gimnasio:
             'fecha_inicio': self.fecha_inicio
         }
 
+    def usuarios_presentes(self, desde: datetime, hasta: datetime) -> List[str]:
+        """IDs de los usuarios que estuvieron en el gimnasio en algún momento entre dos horas"""
+        if hasta < desde:
+            raise ValueError("El fin del intervalo no puede ser menor al inicio")
+        return sorted(self.indice_asistencias.usuarios_presentes(desde, hasta))
+
     def buscar_usuarios(self, criterio: str, valor: str) -> List[Usuario]:
         """Busca usuarios según un criterio específico"""
         resultados = []
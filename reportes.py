@@ -0,0 +1,164 @@
+import os
+import glob
+import hashlib
+from typing import Dict, List, Any, Iterable, Iterator, Sequence
+
+# Cambiar si cambia el diseño del PDF, para invalidar los reportes en caché
+VERSION_FORMATO = 1
+MAX_FILAS = 10_000
+FUENTE_TTF = 'DejaVuSansCondensed.ttf'
+
+def _texto(valor: Any) -> str:
+    # Las fuentes estándar de fpdf solo cubren latin-1
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+def nuevo_pdf():
+    """Crea un FPDF con una página y la fuente DejaVu si está disponible (Arial si no)"""
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_compression(True)
+    pdf.add_page()
+    if os.path.exists(FUENTE_TTF):
+        pdf.add_font('DejaVu', '', FUENTE_TTF, uni=True)
+        pdf.set_font('DejaVu', '', 11)
+        pdf.fuente_unicode = True
+    else:
+        pdf.set_font('Arial', '', 11)
+        pdf.fuente_unicode = False
+    return pdf
+
+def escribir(pdf, texto: Any, alto: float = 8, alinear: str = '') -> None:
+    """Escribe una línea de texto completa"""
+    pdf.cell(0, alto, texto if getattr(pdf, 'fuente_unicode', False) else _texto(texto), 0, 1, alinear)
+
+def dibujar_tabla(pdf, encabezados: Sequence[str], anchos: Sequence[float],
+                  filas: Iterable[Sequence[Any]], max_filas: int = MAX_FILAS,
+                  alto_fila: float = 6) -> int:
+    """
+    Dibuja una tabla paginada, repitiendo los encabezados en cada página.
+    Las filas se consumen de a una, así que pueden venir de un generador.
+    Args:
+        max_filas: Tope de filas dibujadas; las restantes solo se cuentan
+    Returns:
+        Cantidad total de filas recibidas
+    """
+    unicode = getattr(pdf, 'fuente_unicode', False)
+    convertir = str if unicode else _texto
+
+    def encabezado():
+        for titulo, ancho in zip(encabezados, anchos):
+            pdf.cell(ancho, alto_fila + 1, convertir(titulo), 1, 0, 'C')
+        pdf.ln()
+
+    encabezado()
+    total = 0
+    for fila in filas:
+        total += 1
+        if total > max_filas:
+            continue
+        if pdf.get_y() + alto_fila > pdf.page_break_trigger:
+            pdf.add_page()
+            encabezado()
+        for valor, ancho in zip(fila, anchos):
+            pdf.cell(ancho, alto_fila, convertir(valor), 1, 0, 'C')
+        pdf.ln()
+    if total > max_filas:
+        escribir(pdf, f"... {total - max_filas} filas más no incluidas (ver resumen)", alto_fila)
+    return total
+
+def asistencias_del_mes(usuario, mes: int, anio: int) -> Iterator[Dict[str, Any]]:
+    """Recorre los ingresos de un usuario en un mes sin copiarlos"""
+    for registro in usuario.registro_ingreso:
+        fecha = registro['fecha']
+        if fecha.month == mes and fecha.year == anio:
+            yield registro
+
+def resumen_asistencias(registros: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totales de un conjunto de ingresos calculados en una sola pasada"""
+    total, minutos, dias = 0, 0.0, set()
+    for registro in registros:
+        total += 1
+        minutos += registro['tiempo_entrenamiento']
+        dias.add(registro['fecha'])
+    return {
+        'asistencias': total,
+        'minutos_totales': minutos,
+        'promedio_minutos': minutos / total if total else 0.0,
+        'dias_con_asistencia': len(dias),
+    }
+
+def _con_huella(registros: Iterable[Dict[str, Any]], huella) -> Iterator[Dict[str, Any]]:
+    # Suma cada ingreso al hash a medida que pasa, para no recorrer el mes dos veces
+    for registro in registros:
+        huella.update(repr((registro['fecha'], registro['hora_ingreso'], registro['hora_salida'],
+                            registro['tiempo_entrenamiento'])).encode('utf-8'))
+        yield registro
+
+def _fila_asistencia(registro: Dict[str, Any]) -> List[str]:
+    return [
+        registro['fecha'].strftime('%d/%m/%Y'),
+        registro['hora_ingreso'].strftime('%H:%M'),
+        registro['hora_salida'].strftime('%H:%M') if registro['hora_salida'] else '-',
+        f"{registro['tiempo_entrenamiento']:.2f}",
+    ]
+
+class MotorReportes:
+    """
+    Genera los reportes de actividad en PDF y los guarda en disco.
+    Un mes sin cambios se entrega desde la caché en lugar de volver a dibujarse.
+    """
+    def __init__(self, directorio_cache: str = 'reportes_cache', max_filas: int = MAX_FILAS):
+        self.directorio_cache = directorio_cache
+        self.max_filas = max_filas
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _clave(self, usuario, mes: int, anio: int, huella: str) -> str:
+        # La huella sale del contenido de los ingresos del mes: la caché sobrevive entre
+        # ejecuciones y un contador de versión vuelve a empezar con cada Gimnasio
+        datos = (usuario.id_usuario, anio, mes, huella, usuario.nombre, self.max_filas, VERSION_FORMATO)
+        return hashlib.sha1(repr(datos).encode('utf-8')).hexdigest()[:16]
+
+    def _prefijo(self, usuario, mes: int, anio: int) -> str:
+        # El hash del ID original distingue IDs que se sanean igual (U.1 y U_1)
+        id_seguro = ''.join(c if c.isalnum() or c in '-_' else '_' for c in usuario.id_usuario)
+        hash_id = hashlib.sha1(usuario.id_usuario.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.directorio_cache, f"{id_seguro}_{hash_id}_{anio}_{mes:02d}")
+
+    def reporte_actividad(self, usuario, mes: int, anio: int) -> str:
+        """
+        Retorna la ruta del PDF de actividad mensual de un usuario,
+        dibujándolo solo si no hay una versión vigente en caché
+        """
+        huella = hashlib.sha1()
+        resumen = resumen_asistencias(_con_huella(asistencias_del_mes(usuario, mes, anio), huella))
+        prefijo = self._prefijo(usuario, mes, anio)
+        ruta = f"{prefijo}_{self._clave(usuario, mes, anio, huella.hexdigest())}.pdf"
+        if os.path.exists(ruta):
+            self.aciertos += 1
+            return ruta
+        self.fallos += 1
+        os.makedirs(self.directorio_cache, exist_ok=True)
+        # Versiones anteriores del mismo mes ya no sirven
+        for anterior in glob.glob(glob.escape(prefijo) + '_' + '?' * 16 + '.pdf'):
+            os.remove(anterior)
+        pdf = self._dibujar_actividad(usuario, mes, anio, resumen)
+        temporal = ruta + '.tmp'
+        pdf.output(temporal)
+        os.replace(temporal, ruta)
+        return ruta
+
+    def _dibujar_actividad(self, usuario, mes: int, anio: int, resumen: Dict[str, Any]):
+        pdf = nuevo_pdf()
+        escribir(pdf, "Reporte de Actividad", 10, 'C')
+        escribir(pdf, f"Usuario: {usuario.nombre} ({usuario.id_usuario})")
+        escribir(pdf, f"Mes: {mes}, Año: {anio}")
+        escribir(pdf, f"Total de asistencias: {resumen['asistencias']}")
+        escribir(pdf, f"Días con asistencia: {resumen['dias_con_asistencia']}")
+        escribir(pdf, f"Tiempo total de entrenamiento: {resumen['minutos_totales']:.2f} minutos")
+        escribir(pdf, f"Promedio por visita: {resumen['promedio_minutos']:.2f} minutos")
+        pdf.ln(4)
+        dibujar_tabla(pdf, ["Fecha", "Ingreso", "Salida", "Minutos"], [45, 40, 40, 45],
+                      (_fila_asistencia(r) for r in asistencias_del_mes(usuario, mes, anio)),
+                      self.max_filas)
+        return pdf
@@ -1,10 +1,32 @@
+import shutil
 from models import Usuario, Gimnasio
+from reportes import MotorReportes
 from exceptions import *
 from datetime import datetime
-from typing import Dict, Any
-from fpdf import FPDF
+from typing import Dict, Any, Optional
 
-gimnasio = Gimnasio()
+_gimnasio: Optional[Gimnasio] = None
+_motor_reportes: Optional[MotorReportes] = None
+
+def obtener_gimnasio() -> Gimnasio:
+    """Retorna la instancia compartida del gimnasio, creándola en el primer uso"""
+    global _gimnasio
+    if _gimnasio is None:
+        _gimnasio = Gimnasio()
+    return _gimnasio
+
+def obtener_motor_reportes() -> MotorReportes:
+    """Retorna el motor de reportes compartido, creándolo en el primer uso"""
+    global _motor_reportes
+    if _motor_reportes is None:
+        _motor_reportes = MotorReportes()
+    return _motor_reportes
+
+def __getattr__(nombre: str) -> Any:
+    # Compatibilidad con el acceso requisitos.gimnasio
+    if nombre == 'gimnasio':
+        return obtener_gimnasio()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 def handle_exception(func):
     def wrapper(*args, **kwargs):
@@ -18,6 +40,7 @@ def handle_exception(func):
 
 @handle_exception
 def registrar_usuario(id_usuario: str, nombre: str, correo: str, direccion: str, telefono: str) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario in gimnasio.usuarios:
         raise UsuarioYaExisteError(id_usuario)
     
@@ -27,6 +50,7 @@ def registrar_usuario(id_usuario: str, nombre: str, correo: str, direccion: str,
 
 @handle_exception
 def ver_estado_membresia(id_usuario: str) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
@@ -35,6 +59,7 @@ def ver_estado_membresia(id_usuario: str) -> Dict[str, Any]:
 
 @handle_exception
 def registrar_peso_medidas(id_usuario: str, peso: float, altura: float) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
@@ -45,6 +70,7 @@ def registrar_peso_medidas(id_usuario: str, peso: float, altura: float) -> Dict[
 
 @handle_exception
 def registrar_ingreso_salida(id_usuario: str, hora_ingreso: datetime, hora_salida: datetime) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
@@ -58,6 +84,7 @@ def registrar_ingreso_salida(id_usuario: str, hora_ingreso: datetime, hora_salid
 
 @handle_exception
 def congelar_membresia(id_usuario: str) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
@@ -70,6 +97,7 @@ def congelar_membresia(id_usuario: str) -> Dict[str, Any]:
 
 @handle_exception
 def activar_membresia(id_usuario: str) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
@@ -82,37 +110,30 @@ def activar_membresia(id_usuario: str) -> Dict[str, Any]:
 
 @handle_exception
 def ingresar_invitado(nombre_invitado: str) -> Dict[str, Any]:
-    id_invitado = f'invitado_{len(gimnasio.usuarios) + 1}'
-    invitado = Usuario(id_invitado, nombre_invitado, 'invitado@ejemplo.com', 'N/A', 'N/A')
-    gimnasio.agregar_usuario(invitado)
-    return {"error": False, "mensaje": f"Invitado {nombre_invitado} registrado con ID: {id_invitado}"}
+    gimnasio = obtener_gimnasio()
+    if not nombre_invitado or not nombre_invitado.strip():
+        raise DatosInvalidosError("nombre", "el invitado debe tener nombre")
+    visita = gimnasio.invitados.registrar(nombre_invitado.strip())
+    return {"error": False, "mensaje": f"Invitado {nombre_invitado} registrado con ID: {visita['id_invitado']}"}
 
 @handle_exception
 def eliminar_usuario(id_usuario: str) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
     nombre_usuario = gimnasio.usuarios[id_usuario].nombre
-    del gimnasio.usuarios[id_usuario]
+    gimnasio.eliminar_usuario(id_usuario)
     return {"error": False, "mensaje": f"Usuario {nombre_usuario} eliminado exitosamente"}
 
 @handle_exception
 def generar_reporte_pdf(id_usuario: str, mes: int, anio: int) -> Dict[str, Any]:
+    gimnasio = obtener_gimnasio()
     if id_usuario not in gimnasio.usuarios:
         raise UsuarioNoEncontradoError(id_usuario)
     
     usuario = gimnasio.usuarios[id_usuario]
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Reporte de Actividad - {usuario.nombre}", ln=True, align='C')
-    pdf.cell(200, 10, txt=f"Mes: {mes}, Año: {anio}", ln=True)
-    pdf.cell(200, 10, txt=f"Estado de Membresía: {usuario.membresia}", ln=True)
-    
-    for registro in usuario.registro_ingresos:
-        if registro['fecha'].month == mes and registro['fecha'].year == anio:
-            pdf.cell(200, 10, txt=f"Fecha: {registro['fecha']}, Tiempo: {registro['tiempo_entrenamiento']:.2f} min", ln=True)
-    
+    ruta = obtener_motor_reportes().reporte_actividad(usuario, mes, anio)
     filename = f"reporte_{usuario.id_usuario}_{mes}_{anio}.pdf"
-    pdf.output(filename)
+    shutil.copyfile(ruta, filename)
     return {"error": False, "mensaje": f"Reporte generado: {filename}"}
\ No newline at end of file
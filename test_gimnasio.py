@@ -1,5 +1,7 @@
+import os
+import random
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 from models import Usuario, Gimnasio
 from exceptions import *
 
@@ -66,7 +68,7 @@ class TestGimnasio(unittest.TestCase):
             self.usuario_prueba.id_usuario,
             fecha_actual.date(),
             fecha_actual,
-            fecha_actual.replace(hour=fecha_actual.hour + 1)
+            fecha_actual + timedelta(hours=1)
         )
         
         self.assertEqual(len(self.usuario_prueba.registro_ingreso), 1)
@@ -103,5 +105,804 @@ class TestGimnasio(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.gimnasio.eliminar_usuario("usuario_inexistente")
 
+class TestDuplicados(unittest.TestCase):
+    def setUp(self):
+        self.gimnasio = Gimnasio()
+        self.gimnasio.agregar_usuario(Usuario("U001", "Juan Pérez", "juan@ejemplo.com", "", "3001234567"))
+        self.gimnasio.agregar_usuario(Usuario("U002", "María Gómez", "maria@ejemplo.com", "", "3107654321"))
+
+    def test_detecta_duplicados_al_registrar(self):
+        """Prueba que agregar_usuario reporte posibles duplicados"""
+        # Mismo nombre con otra ortografía y otro orden
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U003", "perez juan", "otro@ejemplo.com", "", "3200000000"))
+        self.assertEqual([c['id_usuario'] for c in candidatos], ["U001"])
+        # Mismo correo con otra capitalización y etiqueta
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U004", "Ana Ruiz", "Maria+gym@Ejemplo.com", "", "3300000000"))
+        self.assertEqual(candidatos[0]['id_usuario'], "U002")
+        self.assertIn('correo', candidatos[0]['motivos'])
+        # Teléfono con prefijo de país
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U005", "Maria Gomes", "mg@ejemplo.com", "", "+573107654321"))
+        self.assertIn("U002", [c['id_usuario'] for c in candidatos])
+        # Sin parecido
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U006", "Carlos Torres", "carlos@ejemplo.com", "", "3409999999"))
+        self.assertEqual(candidatos, [])
+
+    def test_eliminar_actualiza_indice(self):
+        """Prueba que un usuario eliminado deje de aparecer como duplicado"""
+        self.gimnasio.eliminar_usuario("U001")
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U003", "Juan Perez", "juan@ejemplo.com", "", "3001234567"))
+        self.assertEqual(candidatos, [])
+
+    def test_letra_de_mas_o_de_menos(self):
+        """Prueba que una letra insertada o borrada en el nombre se detecte"""
+        for nombre in ("Juan Pere", "Juan Perezt"):
+            with self.subTest(nombre=nombre):
+                candidatos = self.gimnasio.indice_duplicados.buscar(nombre, "otro@ejemplo.com", "3200000000")
+                self.assertEqual([c['id_usuario'] for c in candidatos], ["U001"])
+
+    def test_bloque_de_contacto_saturado(self):
+        """Prueba que un teléfono compartido por muchos no se compare contra todos"""
+        from duplicados import LIMITE_BLOQUE
+        self.gimnasio.agregar_usuario(Usuario("E0", "Rosa Quintero", "rosa@ejemplo.com", "", "6015550000"))
+        for i in range(1, LIMITE_BLOQUE + 5):
+            self.gimnasio.agregar_usuario(Usuario(f"E{i}", "Empleado Empresa", f"e{i}@ejemplo.com",
+                                                  "", "6015550000"))
+        indice = self.gimnasio.indice_duplicados
+        self.assertEqual(indice.buscar("Otra Persona", "op@ejemplo.com", "6015550000"), [])
+        self.assertEqual(indice.bloques_saturados("op@ejemplo.com", "6015550000"),
+                         {'telefono': LIMITE_BLOQUE + 5})
+        # Quien además coincide por nombre sigue apareciendo, con el teléfono como motivo
+        candidatos = indice.buscar("Rosa Kintero", "op@ejemplo.com", "6015550000")
+        self.assertEqual(candidatos[0]['id_usuario'], "E0")
+        self.assertIn('telefono', candidatos[0]['motivos'])
+
+    def test_bloque_de_nombre_saturado(self):
+        """Prueba que un bloque de nombre saturado solo guarde la cantidad de usuarios"""
+        from duplicados import IndiceDuplicados
+        indice = IndiceDuplicados(limite_bloque=3)
+        usuarios = [Usuario(f"N{i}", "Maria Lopez", f"n{i}@ejemplo.com", "", f"31000000{i:02d}")
+                    for i in range(5)]
+        for usuario in usuarios:
+            indice.agregar(usuario)
+        bloques_nombre = [b for (tipo, _), b in indice._bloques.items() if tipo[0] == 'n']
+        self.assertTrue(bloques_nombre)
+        self.assertTrue(all(b == 5 for b in bloques_nombre))
+        for usuario in usuarios:
+            indice.eliminar(usuario.id_usuario)
+        self.assertEqual((len(indice), indice._bloques), (0, {}))
+
+    def test_eliminar_desde_requisitos(self):
+        """Prueba que requisitos.eliminar_usuario también limpie el índice de duplicados"""
+        import requisitos
+        anterior, requisitos._gimnasio = requisitos._gimnasio, self.gimnasio
+        try:
+            self.assertFalse(requisitos.eliminar_usuario("U001")["error"])
+        finally:
+            requisitos._gimnasio = anterior
+        candidatos = self.gimnasio.agregar_usuario(
+            Usuario("U003", "Juan Perez", "juan@ejemplo.com", "", "3001234567"))
+        self.assertEqual(candidatos, [])
+
+    def test_detectar_duplicados_en_lote(self):
+        """Prueba la agrupación de duplicados sobre un conjunto existente"""
+        from duplicados import detectar_duplicados
+        self.gimnasio.agregar_usuario(Usuario("U003", "Jhuan Peres", "jp@ejemplo.com", "", "3201111111"))
+        self.gimnasio.agregar_usuario(Usuario("U004", "J. Perez", "x@ejemplo.com", "", "3001234567"))
+        grupos = detectar_duplicados(self.gimnasio.usuarios.values())
+        self.assertEqual(grupos, [["U001", "U003", "U004"]])
+
+class TestInvitados(unittest.TestCase):
+    def test_invitados_separados_de_usuarios(self):
+        """Prueba que los invitados no se agreguen a los usuarios ni a las estadísticas"""
+        gimnasio = Gimnasio()
+        gimnasio.agregar_usuario(Usuario("U001", "Juan Pérez", "juan@ejemplo.com", "", "1234567890"))
+        visita = gimnasio.invitados.registrar("Pedro Invitado")
+        self.assertEqual(visita['id_invitado'], "invitado_1")
+        self.assertEqual(list(gimnasio.usuarios), ["U001"])
+        self.assertEqual(gimnasio.obtener_estadisticas()['total_usuarios'], 1)
+        self.assertEqual(gimnasio.invitados.conteo_dia(datetime.now().date()), 1)
+
+    def test_vencimiento_e_ids_unicos(self):
+        """Prueba el descarte por ttl sin reutilizar IDs"""
+        from datetime import timedelta
+        from invitados import RegistroInvitados
+        registro = RegistroInvitados(ttl=timedelta(days=1))
+        antes = datetime(2024, 1, 1, 8, 0)
+        registro.registrar("Ana", hora_ingreso=antes)
+        registro.registrar("Luis", hora_ingreso=antes)
+        visita = registro.registrar("Sara", hora_ingreso=antes + timedelta(days=2))
+        self.assertEqual(len(registro), 1)
+        self.assertEqual(visita['id_invitado'], "invitado_3")
+        self.assertEqual(registro.conteo_dia(antes.date()), 2)
+
+    def test_vencimiento_visita_atrasada(self):
+        """Prueba que una visita registrada con hora anterior a otras también venza"""
+        from datetime import timedelta
+        from invitados import RegistroInvitados
+        registro = RegistroInvitados(ttl=timedelta(days=1))
+        antes = datetime(2024, 1, 1, 8, 0)
+        registro.registrar("Ana", hora_ingreso=antes + timedelta(hours=12))
+        atrasada = registro.registrar("Luis", hora_ingreso=antes)
+        self.assertEqual(registro.depurar(antes + timedelta(days=1, hours=1)), 1)
+        self.assertNotIn(atrasada['id_invitado'], registro._visitas)
+        self.assertEqual(len(registro), 1)
+
+    def test_ingresar_invitado_requisitos(self):
+        """Prueba que requisitos.ingresar_invitado use el registro de invitados"""
+        import requisitos
+        gimnasio = requisitos.obtener_gimnasio()
+        usuarios_antes = len(gimnasio.usuarios)
+        resultado = requisitos.ingresar_invitado("Marta Invitada")
+        self.assertFalse(resultado['error'])
+        self.assertEqual(len(gimnasio.usuarios), usuarios_antes)
+
+class TestEventos(unittest.TestCase):
+    def setUp(self):
+        from eventos import BusEventos
+        self.bus = BusEventos(retencion=100)
+        self.gimnasio = Gimnasio(bus=self.bus)
+
+    def test_eventos_de_mutaciones(self):
+        """Prueba que cada cambio publique su evento en orden"""
+        from eventos import (UsuarioAgregado, MedidasRegistradas, MembresiaCambiada,
+                             IngresoRegistrado, UsuarioEliminado)
+        suscripcion = self.bus.suscribir()
+        usuario = Usuario("U001", "Juan Pérez", "juan@ejemplo.com", "", "1234567890")
+        self.gimnasio.agregar_usuario(usuario)
+        usuario.registrar_medidas(70.5, 1.75)
+        ahora = datetime.now()
+        self.gimnasio.registrar_ingreso("U001", ahora.date(), ahora, ahora)
+        usuario.congelar_membresia()
+        self.gimnasio.eliminar_usuario("U001")
+        usuario.activar_membresia()  # ya no pertenece al gimnasio: no publica
+
+        tipos = [type(evento) for _, evento in suscripcion.leer()]
+        self.assertEqual(tipos, [UsuarioAgregado, MedidasRegistradas, IngresoRegistrado,
+                                 MembresiaCambiada, UsuarioEliminado])
+
+    def test_lotes_y_cursor_reproducible(self):
+        """Prueba la lectura por lotes y la relectura desde un offset"""
+        suscripcion = self.bus.suscribir(desde=0, tamano_lote=2)
+        for i in range(5):
+            self.gimnasio.agregar_usuario(Usuario(f"U{i}", "Ana Gómez", f"a{i}@ejemplo.com", "", "1234567890"))
+        self.assertEqual([o for o, _ in suscripcion.leer()], [0, 1])
+        self.assertEqual([o for o, _ in suscripcion.leer()], [2, 3])
+        suscripcion.posicionar(1)
+        self.assertEqual(suscripcion.leer()[0][1].id_usuario, "U1")
+
+    def test_contrapresion_descartar(self):
+        """Prueba que un suscriptor lento con política descartar pierda los eventos antiguos"""
+        suscripcion = self.bus.suscribir(capacidad=3, politica='descartar')
+        for i in range(5):
+            self.gimnasio.agregar_usuario(Usuario(f"U{i}", "Ana Gómez", f"a{i}@ejemplo.com", "", "1234567890"))
+        lote = suscripcion.leer()
+        self.assertEqual([e.id_usuario for _, e in lote], ["U2", "U3", "U4"])
+        self.assertEqual(suscripcion.perdidos, 2)
+
+    def test_suscriptor_en_hilo(self):
+        """Prueba la entrega en segundo plano sin perder eventos con política bloquear"""
+        recibidos = []
+        suscripcion = self.bus.suscribir(capacidad=10, tamano_lote=4)
+        suscripcion.iniciar(recibidos.extend, intervalo=0.01)
+        for i in range(50):
+            self.gimnasio.agregar_usuario(Usuario(f"U{i}", "Ana Gómez", f"a{i}@ejemplo.com", "", "1234567890"))
+        import time
+        limite = time.time() + 5
+        while len(recibidos) < 50 and time.time() < limite:
+            time.sleep(0.01)
+        suscripcion.detener()
+        self.assertEqual([o for o, _ in recibidos], list(range(50)))
+        self.assertEqual(suscripcion.perdidos, 0)
+
+class TestFragmentos(unittest.TestCase):
+    def test_gimnasio_distribuido(self):
+        """Prueba el enrutamiento por usuario y la combinación de resultados entre fragmentos"""
+        from fragmentos import GimnasioDistribuido
+        with GimnasioDistribuido(fragmentos=2) as gimnasio:
+            for i in range(10):
+                gimnasio.agregar_usuario(Usuario(f"U{i:03d}", f"Juan Pérez {chr(97 + i)}",
+                                                 f"juan{i}@ejemplo.com", "", f"30012345{i:02d}"))
+            gimnasio.congelar_membresia("U001")
+            ahora = datetime.now()
+            errores = gimnasio.registrar_ingresos([("U002", ahora.date(), ahora, ahora),
+                                                   ("U001", ahora.date(), ahora, ahora)])
+            self.assertEqual([posicion for posicion, _ in errores], [1])
+            self.assertEqual(len(gimnasio.obtener_usuario("U002").registro_ingreso), 1)
+
+            stats = gimnasio.obtener_estadisticas()
+            self.assertEqual((stats['total_usuarios'], stats['usuarios_congelados']), (10, 1))
+            self.assertEqual(sum(stats['usuarios_por_fragmento']), 10)
+            self.assertEqual(len(gimnasio.buscar_usuarios('nombre', 'juan')), 10)
+            with self.assertRaises(ValueError):
+                gimnasio.obtener_usuario("inexistente")
+
+class TestLote(unittest.TestCase):
+    def setUp(self):
+        from main import Console
+        self.console = Console()
+        self.operaciones = [
+            {"op": "registrar_usuario", "id_usuario": "U001", "nombre": "Juan Pérez",
+             "correo": "juan@ejemplo.com", "telefono": "1234567890"},
+            {"op": "registrar_medidas", "id_usuario": "U001", "peso": 70.5, "altura": 1.75},
+            {"op": "registrar_asistencia", "id_usuario": "U001",
+             "hora_ingreso": "2024-05-01T07:00:00", "hora_salida": "2024-05-01T08:30:00"},
+            {"op": "congelar_membresia", "id_usuario": "U001"},
+        ]
+
+    def test_lote_exitoso(self):
+        """Prueba la ejecución de un lote sin errores"""
+        resumen = self.console.ejecutar_lote(self.operaciones)
+        self.assertEqual(resumen['exitosas'], 4)
+        usuario = self.console.gimnasio.obtener_usuario("U001")
+        self.assertEqual(usuario.membresia, "Congelada")
+        self.assertEqual(usuario.tiempo_entrenamiento_total, 90)
+
+    def test_lote_atomico_revierte(self):
+        """Prueba que un error revierta todas las operaciones del lote"""
+        self.console.gimnasio.agregar_usuario(Usuario("U000", "Ana Gómez", "ana@ejemplo.com", "", "1234567890"))
+        self.operaciones.insert(0, {"op": "congelar_membresia", "id_usuario": "U000"})
+        self.operaciones.insert(1, {"op": "registrar_usuario", "id_usuario": "U002", "nombre": "Ana Gomez",
+                                    "correo": "ana@ejemplo.com", "telefono": "1234567890"})
+        self.operaciones.append({"op": "congelar_membresia", "id_usuario": "U001"})
+        resumen = self.console.ejecutar_lote(self.operaciones)
+        self.assertTrue(resumen['revertido'])
+        self.assertEqual(resumen['errores'][0]['linea'], 7)
+        # Los usuarios revertidos no se informan como posibles duplicados
+        self.assertEqual(resumen['posibles_duplicados'], [])
+        self.assertEqual(list(self.console.gimnasio.usuarios), ["U000"])
+        self.assertEqual(self.console.gimnasio.obtener_usuario("U000").membresia, "Activa")
+
+    def test_lote_no_atomico(self):
+        """Prueba que sin atomicidad se apliquen las operaciones válidas"""
+        self.operaciones.append({"op": "desconocida"})
+        resumen = self.console.ejecutar_lote(self.operaciones, atomico=False)
+        self.assertEqual((resumen['exitosas'], resumen['fallidas']), (4, 1))
+        self.assertIn("U001", self.console.gimnasio.usuarios)
+
+    def test_lote_entrada_invalida_revierte(self):
+        """Prueba que líneas mal formadas u operaciones con tipos inválidos fallen y reviertan el lote"""
+        import json
+        registro = {"op": "registrar_usuario", "id_usuario": "A", "nombre": "Ana Gómez",
+                    "correo": "ana@ejemplo.com", "telefono": "1234567890"}
+        invalidas = ['{"op": ', '[1, 2]', json.dumps(dict(registro, id_usuario="B", nombre=5))]
+        for invalida in invalidas:
+            with self.subTest(invalida=invalida):
+                resumen = self.console.ejecutar_lote([json.dumps(registro), invalida])
+                self.assertTrue(resumen['revertido'])
+                self.assertEqual(resumen['errores'][0]['linea'], 2)
+                self.assertEqual(self.console.gimnasio.usuarios, {})
+
+class TestMetricas(unittest.TestCase):
+    def setUp(self):
+        import metricas
+        self.metricas = metricas
+        metricas.registro.reiniciar()
+        metricas.habilitar()
+
+    def tearDown(self):
+        self.metricas.deshabilitar()
+        self.metricas.registro.reiniciar()
+
+    def test_instrumentacion_handle_exception(self):
+        """Prueba que handle_exception registre llamadas, errores y latencias"""
+        @handle_exception
+        def operacion(valido):
+            if not valido:
+                raise MembresiaError("membresía inválida")
+            return "ok"
+
+        operacion(True)
+        operacion(False)
+        nombre = operacion.__qualname__
+        self.assertEqual(self.metricas.registro.llamadas[nombre], 2)
+        self.assertEqual(self.metricas.registro.errores[(nombre, "MembresiaError")], 1)
+
+        texto = self.metricas.exportar_prometheus()
+        self.assertIn(f'gimnasio_latencia_segundos_count{{operacion="{nombre}"}} 2', texto)
+        self.assertIn('le="+Inf"', texto)
+
+    def test_deshabilitado_no_registra(self):
+        """Prueba que sin habilitar no se acumulen métricas"""
+        self.metricas.deshabilitar()
+        handle_exception(lambda: None)()
+        self.assertEqual(len(self.metricas.registro.llamadas), 0)
+
+class TestImportacion(unittest.TestCase):
+    def test_importacion_sin_dependencias_pesadas(self):
+        """Prueba que importar los módulos no cargue fpdf, tkinter ni configure logging"""
+        import subprocess
+        import sys
+        codigo = (
+            "import sys, logging, main, requisitos, gui; "
+            "assert 'fpdf' not in sys.modules, 'fpdf'; "
+            "assert 'tkinter' not in sys.modules, 'tkinter'; "
+            "assert not logging.getLogger().handlers, 'logging'; "
+            "assert requisitos._gimnasio is None, 'gimnasio'"
+        )
+        proceso = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True)
+        self.assertEqual(proceso.returncode, 0, proceso.stderr)
+
+class TestReportes(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from reportes import MotorReportes
+        self.directorio = tempfile.TemporaryDirectory()
+        self.motor = MotorReportes(self.directorio.name, max_filas=100)
+        self.gimnasio = Gimnasio()
+        self.usuario = Usuario("U001", "Juan Pérez", "juan@ejemplo.com", "", "1234567890")
+        self.gimnasio.agregar_usuario(self.usuario)
+        for dia in range(1, 29):
+            for hora in range(6, 16):
+                self.gimnasio.registrar_ingreso("U001", datetime(2024, 5, dia).date(),
+                                                datetime(2024, 5, dia, hora), datetime(2024, 5, dia, hora, 45))
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_cache_reporte(self):
+        """Prueba que un mes sin cambios se sirva desde la caché"""
+        import os
+        ruta = self.motor.reporte_actividad(self.usuario, 5, 2024)
+        self.assertEqual(self.motor.reporte_actividad(self.usuario, 5, 2024), ruta)
+        self.assertEqual((self.motor.aciertos, self.motor.fallos), (1, 1))
+        self.gimnasio.registrar_ingreso("U001", datetime(2024, 5, 30).date(),
+                                        datetime(2024, 5, 30, 7), datetime(2024, 5, 30, 8))
+        nueva = self.motor.reporte_actividad(self.usuario, 5, 2024)
+        self.assertNotEqual(nueva, ruta)
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_cache_entre_gimnasios(self):
+        """Prueba que la caché distinga los ingresos de otro gimnasio y los IDs que se sanean igual"""
+        import os
+        from reportes import MotorReportes
+        rutas = []
+        for dia in (1, 2):
+            gimnasio = Gimnasio()
+            usuario = Usuario("U1", "Ana Gómez", "ana@ejemplo.com", "", "1234567890")
+            gimnasio.agregar_usuario(usuario)
+            gimnasio.registrar_ingreso("U1", datetime(2024, 5, dia).date(),
+                                       datetime(2024, 5, dia, 7), datetime(2024, 5, dia, 8))
+            motor = MotorReportes(self.directorio.name)
+            rutas.append(motor.reporte_actividad(usuario, 5, 2024))
+            self.assertEqual(motor.aciertos, 0)
+        self.assertNotEqual(rutas[0], rutas[1])
+        otro = Usuario("U.1", "Ana Gómez", "ana2@ejemplo.com", "", "1234567890")
+        self.assertNotEqual(self.motor._prefijo(otro, 5, 2024), self.motor._prefijo(usuario, 5, 2024))
+        MotorReportes(self.directorio.name).reporte_actividad(otro, 5, 2024)
+        self.assertTrue(os.path.exists(rutas[1]))
+
+    def test_tabla_paginada(self):
+        """Prueba que la tabla se pagine y respete el tope de filas"""
+        from reportes import nuevo_pdf, dibujar_tabla
+        pdf = nuevo_pdf()
+        total = dibujar_tabla(pdf, ["N"], [20], ([i] for i in range(500)), max_filas=100)
+        self.assertEqual(total, 500)
+        self.assertGreater(pdf.page_no(), 1)
+
+class TestAgregados(unittest.TestCase):
+    def setUp(self):
+        self.gimnasio = Gimnasio()
+        for i in range(6):
+            usuario = Usuario(f"U{i}", f"Usuario {i}", f"u{i}@ejemplo.com", "", "1234567890")
+            self.gimnasio.agregar_usuario(usuario)
+            for dia in (1, 2):
+                self.gimnasio.registrar_ingreso(usuario.id_usuario, datetime(2024, 5, dia).date(),
+                                                datetime(2024, 5, dia, 7), datetime(2024, 5, dia, 8))
+            usuario.medidas = [{'fecha': datetime(2024, 5, 1), 'peso': 80, 'altura': 2, 'imc': 20.0},
+                               {'fecha': datetime(2024, 5, 20), 'peso': 84, 'altura': 2, 'imc': 21.0}]
+        self.gimnasio.obtener_usuario("U0").congelar_membresia()
+
+    def test_agregado_mensual(self):
+        """Prueba los totales del reporte general y la combinación por partes"""
+        from agregados import agregado_mensual
+        usuarios = list(self.gimnasio.usuarios.values())
+        resumen = agregado_mensual(usuarios, 5, 2024).resumen()
+        self.assertEqual((resumen['usuarios_activos'], resumen['usuarios_congelados']), (5, 1))
+        self.assertEqual(resumen['visitas_totales'], 12)
+        self.assertEqual(resumen['promedio_minutos_sesion'], 60)
+        self.assertAlmostEqual(resumen['variacion_imc_promedio'], 1.0)
+        combinado = agregado_mensual(usuarios[:2], 5, 2024).combinar(agregado_mensual(usuarios[2:], 5, 2024))
+        self.assertEqual(combinado.resumen(), resumen)
+        self.assertEqual(list(combinado.filas_por_dia())[0][1:], (6, 20.0, 6))
+
+class TestAsistencias(unittest.TestCase):
+    def test_consultas_por_rango(self):
+        """Prueba las consultas por rango y por solapamiento del índice de asistencias"""
+        gimnasio = Gimnasio()
+        for i, (inicio, fin) in enumerate([(6, 7), (7, 9), (5, 10), (12, 13)]):
+            gimnasio.agregar_usuario(Usuario(f"U{i}", f"Usuario {i}", f"u{i}@ejemplo.com", "", "1234567890"))
+            gimnasio.registrar_ingreso(f"U{i}", datetime(2024, 5, 1).date(),
+                                       datetime(2024, 5, 1, inicio), datetime(2024, 5, 1, fin))
+        desde, hasta = datetime(2024, 5, 1, 8), datetime(2024, 5, 1, 8, 30)
+        self.assertEqual(gimnasio.usuarios_presentes(desde, hasta), ["U1", "U2"])
+        ingresos = gimnasio.indice_asistencias.ingresos_entre(datetime(2024, 5, 1, 6), datetime(2024, 5, 1, 7))
+        self.assertEqual([a[1] for a in ingresos], ["U0", "U1"])
+        gimnasio.anular_ingreso("U1")
+        gimnasio.eliminar_usuario("U2")
+        self.assertEqual(gimnasio.usuarios_presentes(desde, hasta), [])
+        self.assertEqual(len(gimnasio.indice_asistencias), 2)
+
+    def test_sesion_larga_y_duracion_maxima(self):
+        """Prueba que una sesión de varios días no amplíe la ventana y que la máxima se recalcule"""
+        from asistencias import IndiceAsistencias
+        indice = IndiceAsistencias()
+        dia = datetime(2024, 5, 1)
+        indice.agregar("U0", dia.replace(hour=6), dia.replace(hour=8))
+        indice.agregar("U1", dia.replace(hour=7), dia.replace(hour=8))
+        indice.agregar("U2", dia.replace(hour=5), dia + timedelta(days=3))
+        self.assertEqual(indice.duracion_maxima, timedelta(hours=2))
+        desde = dia + timedelta(days=2)
+        self.assertEqual(indice.usuarios_presentes(desde, desde + timedelta(hours=1)), {"U2"})
+        self.assertEqual([a[1] for a in indice.presentes_entre(dia.replace(hour=7), dia.replace(hour=9))],
+                         ["U2", "U0", "U1"])
+        indice.eliminar("U0", dia.replace(hour=6), dia.replace(hour=8))
+        self.assertEqual(indice.duracion_maxima, timedelta(hours=1))
+        indice.eliminar_usuario("U2", [(dia.replace(hour=5), "U2", dia + timedelta(days=3))])
+        self.assertEqual(indice.usuarios_presentes(desde, desde + timedelta(hours=1)), set())
+
+    def test_eliminar_desde_requisitos(self):
+        """Prueba que eliminar un usuario desde requisitos también quite sus asistencias del índice"""
+        import requisitos
+        gimnasio = Gimnasio()
+        gimnasio.agregar_usuario(Usuario("U0", "Usuario 0", "u0@ejemplo.com", "", "1234567890"))
+        gimnasio.registrar_ingreso("U0", datetime(2024, 5, 1).date(),
+                                   datetime(2024, 5, 1, 7), datetime(2024, 5, 1, 8))
+        anterior, requisitos._gimnasio = requisitos._gimnasio, gimnasio
+        try:
+            requisitos.eliminar_usuario("U0")
+        finally:
+            requisitos._gimnasio = anterior
+        self.assertEqual(len(gimnasio.indice_asistencias), 0)
+
+class TestIndicadores(unittest.TestCase):
+    def test_indicadores_incrementales(self):
+        """Prueba los indicadores derivados y su invalidación al editar o eliminar"""
+        usuario = Usuario("U001", "Juan Pérez", "juan@ejemplo.com", "", "1234567890")
+        self.assertIsNone(usuario.obtener_indicadores())
+        for peso in (80, 84, 88):
+            usuario.registrar_medidas(peso, 2)
+        indicadores = usuario.obtener_indicadores()
+        self.assertEqual((indicadores['imc'], indicadores['categoria']), (22.0, "Normal"))
+        self.assertEqual((indicadores['variacion_imc'], indicadores['promedio_imc']), (1.0, 21.0))
+        self.assertEqual(usuario.editar_medida(0, 120, 2)['imc'], 30.0)
+        self.assertEqual(usuario.obtener_indicadores(0)['categoria'], "Obesidad")
+        self.assertEqual(usuario.obtener_indicadores(1)['variacion_imc'], -9.0)
+        usuario.eliminar_medida(1)
+        self.assertEqual(usuario.obtener_indicadores()['variacion_imc'], -8.0)
+        for indice in (2, -3):
+            with self.assertRaises(IndexError):
+                usuario.eliminar_medida(indice)
+            with self.assertRaises(IndexError):
+                usuario.editar_medida(indice, 70, 2)
+        self.assertEqual(usuario.editar_medida(-2, 120, 2), usuario.medidas[0])
+        self.assertEqual(len(usuario.medidas), 2)
+        # Un usuario cargado sin caché la reconstruye al consultarla
+        del usuario._indicadores
+        self.assertEqual(usuario.obtener_indicadores()['promedio_imc'], 26.0)
+
+class TestAbandono(unittest.TestCase):
+    def test_puntaje_e_incremental(self):
+        """Prueba que baje el riesgo de quien entrena seguido y la repuntuación incremental"""
+        from abandono import MotorAbandono
+        gimnasio = Gimnasio()
+        ahora = datetime(2024, 6, 1)
+        for id_usuario, dias in (("U1", range(1, 84, 2)), ("U2", range(60, 84, 10))):
+            gimnasio.agregar_usuario(Usuario(id_usuario, "Juan Pérez", f"{id_usuario}@ejemplo.com", "", "1234567890"))
+            for dia in dias:
+                hora = ahora - timedelta(days=dia)
+                gimnasio.registrar_ingreso(id_usuario, hora.date(), hora, hora + timedelta(hours=1))
+        motor = MotorAbandono()
+        self.assertEqual(motor.puntuar_todos(gimnasio.usuarios.values(), ahora), 2)
+        self.assertLess(motor.caracteristicas("U1")['puntaje'], motor.caracteristicas("U2")['puntaje'])
+        self.assertAlmostEqual(motor.caracteristicas("U2")['dias_sin_visitar'], 60)
+        self.assertLess(motor.caracteristicas("U2")['tendencia'], 0)
+        self.assertEqual([i for i, _ in motor.en_riesgo(gimnasio.usuarios, 0.9)], ["U2"])
+
+        gimnasio.registrar_ingreso("U2", ahora.date(), ahora - timedelta(hours=2), ahora - timedelta(hours=1))
+        gimnasio.eliminar_usuario("U1")
+        self.assertEqual(motor.actualizar(gimnasio.usuarios, ahora), 1)
+        self.assertEqual(motor.ids, ["U2"])
+        self.assertLess(motor.caracteristicas("U2")['dias_sin_visitar'], 1)
+
+class TestTorniquetes(unittest.TestCase):
+    def setUp(self):
+        self.gimnasio = Gimnasio()
+        for i in range(3):
+            self.gimnasio.agregar_usuario(Usuario(f"U{i}", f"Usuario {i}", f"u{i}@ejemplo.com", "", "1234567890"))
+        self.gimnasio.obtener_usuario("U2").congelar_membresia()
+        self.inicio = datetime(2024, 5, 1, 6)
+
+    def test_descarte_y_lotes(self):
+        """Prueba el descarte de lecturas repetidas y el registro por lotes"""
+        from torniquetes import IngestaTorniquetes, ACEPTADO, DUPLICADO
+        ingesta = IngestaTorniquetes(self.gimnasio, tamano_lote=2, capacidad=4)
+        lecturas = [("U0", 0), ("U0", 5), ("U1", 6), ("U0", 40), ("U2", 41)]
+        resultados = [ingesta.recibir(i, self.inicio + timedelta(seconds=s)) for i, s in lecturas]
+        self.assertEqual(resultados, [ACEPTADO, DUPLICADO, ACEPTADO, ACEPTADO, ACEPTADO])
+        self.assertEqual(ingesta.lotes, 2)
+        self.assertEqual(ingesta.recibir("U1", self.inicio + timedelta(seconds=50)), ACEPTADO)
+        self.assertEqual(ingesta.vaciar(), 1)
+        estadisticas = ingesta.estadisticas()
+        self.assertEqual((estadisticas['registradas'], estadisticas['fallidas'], estadisticas['pendientes']),
+                         (4, 1, 0))
+        self.assertEqual(len(self.gimnasio.obtener_usuario("U0").registro_ingreso), 2)
+        self.assertEqual(len(self.gimnasio.indice_asistencias), 4)
+
+    def test_hilo(self):
+        """Prueba que el hilo registre todo lo recibido antes de detenerse"""
+        from torniquetes import IngestaTorniquetes
+        ingesta = IngestaTorniquetes(self.gimnasio, tamano_lote=10, capacidad=20)
+        ingesta.iniciar(intervalo=0.01)
+        for minuto in range(50):
+            ingesta.recibir(f"U{minuto % 2}", self.inicio + timedelta(minutes=minuto))
+        ingesta.detener()
+        self.assertEqual(ingesta.estadisticas()['registradas'] + ingesta.rechazadas, 50)
+        self.assertEqual(len(self.gimnasio.indice_asistencias), ingesta.registradas)
+
+    def _verificar_contadores(self, ingesta):
+        e = ingesta.estadisticas()
+        self.assertEqual(e['recibidas'], e['duplicadas'] + e['rechazadas'] + e['registradas']
+                         + e['fallidas'] + e['pendientes'])
+
+    def test_lectura_con_error_inesperado(self):
+        """Prueba que una lectura con un error inesperado cuente como fallida sin perder el resto del lote"""
+        from datetime import timezone
+        from torniquetes import IngestaTorniquetes
+        registrar_lote = self.gimnasio.registrar_ingresos_lote
+        salida = self.inicio.replace(tzinfo=timezone.utc)
+        # La lectura de U1 trae una hora de salida con zona horaria, que no se puede comparar
+        self.gimnasio.registrar_ingresos_lote = lambda registros: registrar_lote(
+            [(i, f, h, salida if i == "U1" else s) for i, f, h, s in registros])
+        for hilo in (False, True):
+            with self.subTest(hilo=hilo):
+                ingesta = IngestaTorniquetes(self.gimnasio, tamano_lote=3, capacidad=6)
+                if hilo:
+                    ingesta.iniciar(intervalo=0.01)
+                for minuto, id_usuario in enumerate(("U1", "U0", "U0")):
+                    ingesta.recibir(id_usuario, self.inicio + timedelta(days=hilo, minutes=minuto))
+                ingesta.detener()
+                self.assertEqual((ingesta.registradas, ingesta.fallidas, ingesta.lotes_fallidos), (2, 1, 0))
+                self._verificar_contadores(ingesta)
+        self.assertEqual(len(self.gimnasio.indice_asistencias), 4)
+
+    def test_hilo_sigue_tras_error(self):
+        """Prueba que un lote que falla entero no detenga el hilo y se cuente como fallido"""
+        from torniquetes import IngestaTorniquetes
+        ingesta = IngestaTorniquetes(self.gimnasio, tamano_lote=2, capacidad=4)
+        registrar_lote = self.gimnasio.registrar_ingresos_lote
+        def fallar(registros):
+            raise RuntimeError("base de datos no disponible")
+        self.gimnasio.registrar_ingresos_lote = fallar
+        ingesta.iniciar(intervalo=0.01)
+        ingesta.recibir("U0", self.inicio)
+        ingesta.recibir("U1", self.inicio)
+        ingesta.detener()
+        self.assertEqual((ingesta.lotes_fallidos, ingesta.fallidas), (1, 2))
+        self.gimnasio.registrar_ingresos_lote = registrar_lote
+        ingesta.iniciar(intervalo=0.01)
+        ingesta.recibir("U0", self.inicio + timedelta(minutes=5))
+        ingesta.detener()
+        self.assertEqual(ingesta.registradas, 1)
+        self.assertEqual(len(self.gimnasio.indice_asistencias), 1)
+        self._verificar_contadores(ingesta)
+
+class ModeloReferencia:
+    """Versión trivial del estado esperado del gimnasio, usada por TestPropiedades"""
+    def __init__(self):
+        self.usuarios = {}
+
+    def agregar(self, id_usuario, nombre):
+        self.usuarios[id_usuario] = {'nombre': nombre, 'membresia': "Activa", 'ingresos': [], 'medidas': 0}
+
+class TestPropiedades(unittest.TestCase):
+    """
+    Ejecuta secuencias aleatorias de operaciones sobre Gimnasio y sobre un
+    modelo de referencia, y verifica que los datos derivados coincidan.
+    GIMNASIO_CARGA=<operaciones> activa además la prueba de carga sostenida.
+    """
+    NOMBRES = ["Juan Pérez", "Ana Gómez", "Luis Díaz", "María López", "Carlos Ruiz"]
+
+    def setUp(self):
+        from eventos import BusEventos
+        self.bus = BusEventos(retencion=1000)
+        self.gimnasio = Gimnasio(bus=self.bus)
+        self.modelo = ModeloReferencia()
+        self.siguiente_id = 0
+        self.eventos = 0
+        self.rng_consultas = random.Random(1)
+
+    def operacion_aleatoria(self, rng, max_usuarios=200, max_ingresos=20):
+        """Aplica una operación al azar en ambos lados y retorna su nombre"""
+        gimnasio, modelo = self.gimnasio, self.modelo
+        ids = list(modelo.usuarios)
+        opciones = ['agregar'] if len(ids) < max_usuarios else ['eliminar']
+        if ids:
+            opciones += ['eliminar', 'congelar', 'activar', 'ingreso', 'ingreso', 'medidas',
+                         'anular', 'editar_medida', 'eliminar_medida', 'duplicado']
+        operacion = rng.choice(opciones)
+        id_usuario = rng.choice(ids) if ids else None
+        esperado = modelo.usuarios.get(id_usuario)
+
+        if operacion == 'agregar':
+            self.siguiente_id += 1
+            id_usuario, nombre = f"P{self.siguiente_id}", rng.choice(self.NOMBRES)
+            gimnasio.agregar_usuario(Usuario(id_usuario, nombre, f"{id_usuario}@ejemplo.com", "", "1234567890"))
+            modelo.agregar(id_usuario, nombre)
+            self.eventos += 1
+        elif operacion == 'duplicado':
+            with self.assertRaises(ValueError):
+                gimnasio.agregar_usuario(Usuario(id_usuario, "Otro", "otro@ejemplo.com", "", "1234567890"))
+        elif operacion == 'eliminar':
+            gimnasio.eliminar_usuario(id_usuario)
+            del modelo.usuarios[id_usuario]
+            self.eventos += 1
+        elif operacion in ('congelar', 'activar'):
+            usuario = gimnasio.obtener_usuario(id_usuario)
+            valida = esperado['membresia'] == ("Activa" if operacion == 'congelar' else "Congelada")
+            metodo = usuario.congelar_membresia if operacion == 'congelar' else usuario.activar_membresia
+            if valida:
+                metodo()
+                esperado['membresia'] = "Congelada" if operacion == 'congelar' else "Activa"
+                self.eventos += 1
+            else:
+                with self.assertRaises(ValueError):
+                    metodo()
+        elif operacion == 'ingreso':
+            if len(esperado['ingresos']) >= max_ingresos:
+                operacion = 'anular'
+            else:
+                hora_ingreso = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(365 * 24 * 60))
+                hora_salida = hora_ingreso + timedelta(minutes=rng.randrange(181)) if rng.random() < 0.8 else None
+                if esperado['membresia'] == "Activa":
+                    gimnasio.registrar_ingreso(id_usuario, hora_ingreso.date(), hora_ingreso, hora_salida)
+                    minutos = (hora_salida - hora_ingreso).total_seconds() / 60 if hora_salida else 0
+                    esperado['ingresos'].append((hora_ingreso, minutos))
+                    self.eventos += 1
+                else:
+                    with self.assertRaises(ValueError):
+                        gimnasio.registrar_ingreso(id_usuario, hora_ingreso.date(), hora_ingreso, hora_salida)
+        elif operacion == 'medidas':
+            gimnasio.obtener_usuario(id_usuario).registrar_medidas(rng.uniform(40, 120), rng.uniform(1.4, 2.1))
+            esperado['medidas'] += 1
+            self.eventos += 1
+        elif operacion == 'editar_medida':
+            usuario = gimnasio.obtener_usuario(id_usuario)
+            if esperado['medidas']:
+                usuario.editar_medida(rng.randrange(esperado['medidas']), rng.uniform(40, 120), rng.uniform(1.4, 2.1))
+                self.eventos += 1
+            else:
+                with self.assertRaises(ValueError):
+                    usuario.editar_medida(0, 70, 1.75)
+        elif operacion == 'eliminar_medida':
+            if esperado['medidas']:
+                gimnasio.obtener_usuario(id_usuario).eliminar_medida(rng.randrange(esperado['medidas']))
+                esperado['medidas'] -= 1
+                self.eventos += 1
+            else:
+                with self.assertRaises(ValueError):
+                    gimnasio.obtener_usuario(id_usuario).eliminar_medida()
+
+        if operacion == 'anular':
+            if esperado['ingresos']:
+                registro = gimnasio.anular_ingreso(id_usuario)
+                self.assertEqual(registro['hora_ingreso'], esperado['ingresos'].pop()[0])
+                self.eventos += 1
+            else:
+                with self.assertRaises(ValueError):
+                    gimnasio.anular_ingreso(id_usuario)
+        return operacion
+
+    def verificar(self):
+        """Compara todo lo derivado del Gimnasio contra el modelo de referencia"""
+        gimnasio, modelo = self.gimnasio, self.modelo
+        self.assertEqual(set(gimnasio.usuarios), set(modelo.usuarios))
+        activos = sum(1 for u in modelo.usuarios.values() if u['membresia'] == "Activa")
+        estadisticas = gimnasio.obtener_estadisticas()
+        self.assertEqual((estadisticas['total_usuarios'], estadisticas['usuarios_activos'],
+                          estadisticas['usuarios_congelados']),
+                         (len(modelo.usuarios), activos, len(modelo.usuarios) - activos))
+        for membresia in ("Activa", "Congelada"):
+            self.assertEqual({u.id_usuario for u in gimnasio.buscar_usuarios('membresia', membresia)},
+                             {i for i, u in modelo.usuarios.items() if u['membresia'] == membresia})
+        for nombre in self.NOMBRES:
+            self.assertEqual({u.id_usuario for u in gimnasio.buscar_usuarios('nombre', nombre.split()[0])},
+                             {i for i, u in modelo.usuarios.items() if u['nombre'] == nombre})
+        for id_usuario, esperado in modelo.usuarios.items():
+            usuario = gimnasio.obtener_usuario(id_usuario)
+            self.assertEqual(usuario.membresia, esperado['membresia'])
+            self.assertEqual([r['hora_ingreso'] for r in usuario.registro_ingreso],
+                             [hora for hora, _ in esperado['ingresos']])
+            total = sum(minutos for _, minutos in esperado['ingresos'])
+            self.assertAlmostEqual(usuario.tiempo_entrenamiento_total, total, places=6)
+            self.assertAlmostEqual(usuario.calcular_tiempo_total_entrenamiento(), total, places=6)
+            self.assertEqual(len(usuario.medidas), esperado['medidas'])
+            # Los indicadores en caché deben coincidir con recalcularlos desde cero
+            from indicadores import IndicadoresMedidas
+            self.assertEqual(usuario.indicadores.todos(usuario.medidas),
+                             IndicadoresMedidas().todos(usuario.medidas))
+        self.assertEqual(self.bus.siguiente_offset, self.eventos)
+        # El índice global de asistencias debe coincidir con recorrer todos los ingresos
+        ingresos = [(hora, id_usuario, minutos) for id_usuario, u in modelo.usuarios.items()
+                    for hora, minutos in u['ingresos']]
+        self.assertEqual(len(gimnasio.indice_asistencias), len(ingresos))
+        desde = datetime(2024, 1, 1) + timedelta(minutes=self.rng_consultas.randrange(365 * 24 * 60))
+        hasta = desde + timedelta(hours=self.rng_consultas.choice([1, 24, 24 * 30]))
+        self.assertEqual(gimnasio.usuarios_presentes(desde, hasta),
+                         sorted({i for hora, i, minutos in ingresos
+                                 if hora <= hasta and hora + timedelta(minutes=minutos) >= desde}))
+        # Los usuarios eliminados no deben quedar en el índice de duplicados
+        indice = gimnasio.indice_duplicados
+        self.assertEqual(set(indice._datos), set(modelo.usuarios))
+        self.assertLessEqual(set().union(*(b for b in indice._bloques.values() if type(b) is not int)),
+                             set(modelo.usuarios))
+
+    def test_secuencias_aleatorias(self):
+        """Prueba secuencias aleatorias de operaciones contra el modelo de referencia"""
+        for semilla in range(20):
+            with self.subTest(semilla=semilla):
+                self.setUp()
+                rng = random.Random(semilla)
+                for paso in range(300):
+                    self.operacion_aleatoria(rng, max_usuarios=30, max_ingresos=8)
+                    if paso % 25 == 0:
+                        self.verificar()
+                self.verificar()
+
+    @unittest.skipUnless(os.environ.get('GIMNASIO_CARGA'), "definir GIMNASIO_CARGA=<operaciones>")
+    def test_carga_sostenida(self):
+        """Prueba que una carga sostenida de operaciones no acumule memoria"""
+        import gc
+        import tracemalloc
+        operaciones = int(os.environ['GIMNASIO_CARGA'])
+        rng = random.Random(0)
+        tracemalloc.start()
+        try:
+            tramo = max(operaciones // 10, 1)
+            memoria = []
+            for paso in range(1, operaciones + 1):
+                self.operacion_aleatoria(rng)
+                if paso % tramo == 0:
+                    self.verificar()
+                    # Al vaciar el gimnasio solo debería quedar memoria de tamaño fijo (p. ej. el bus)
+                    for id_usuario in list(self.modelo.usuarios):
+                        self.gimnasio.eliminar_usuario(id_usuario)
+                        del self.modelo.usuarios[id_usuario]
+                        self.eventos += 1
+                    self.verificar()
+                    gc.collect()
+                    memoria.append(tracemalloc.get_traced_memory()[0])
+        finally:
+            tracemalloc.stop()
+        # Se descarta el primer tramo, en el que se llenan el bus y las tablas internas
+        self.assertLess(max(memoria[1:]) - memoria[1], 0.1 * memoria[1] + 64 * 1024, memoria)
+
+class TestBenchmark(unittest.TestCase):
+    def test_comparar_con_baseline(self):
+        """Prueba la detección de regresiones contra la baseline"""
+        from benchmark import comparar_con_baseline
+        baseline = {"resultados": {"a@10": {"us_por_operacion": 1.0},
+                                   "b@10": {"us_por_operacion": 1.0}}}
+        actual = {"resultados": {"a@10": {"us_por_operacion": 1.1},
+                                 "b@10": {"us_por_operacion": 2.0},
+                                 "c@10": {"omitido": "sin fpdf"}}}
+        regresiones = comparar_con_baseline(actual, baseline, tolerancia=0.2)
+        self.assertEqual([r['caso'] for r in regresiones], ["b@10"])
+        # Un caso con baseline que ahora falla también es regresión
+        actual["resultados"]["a@10"] = {"error": "AttributeError: roto"}
+        regresiones = comparar_con_baseline(actual, baseline, tolerancia=0.2)
+        self.assertEqual([r['caso'] for r in regresiones], ["a@10", "b@10"])
+
+    def test_ejecutar_benchmarks(self):
+        """Prueba que los casos se ejecuten en escala pequeña"""
+        from benchmark import ejecutar_benchmarks
+        resultados = ejecutar_benchmarks([10], ['agregar_usuario', 'registrar_ingreso'], repeticiones=1)
+        self.assertEqual(resultados['resultados']['agregar_usuario@10']['operaciones'], 10)
+        self.assertIn('us_por_operacion', resultados['resultados']['registrar_ingreso@10'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
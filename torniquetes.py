@@ -0,0 +1,171 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Deque, Optional, Tuple
+from exceptions import logger
+
+# Resultado de recibir una lectura de torniquete
+ACEPTADO = 'aceptado'
+DUPLICADO = 'duplicado'
+RECHAZADO = 'rechazado'
+
+class IngestaTorniquetes:
+    """
+    Etapa de entrada para las lecturas de los torniquetes.
+    - Descarta las lecturas repetidas de un mismo usuario dentro de
+      `ventana_duplicados`, que hoy generan visitas de cero minutos.
+    - Junta las lecturas aceptadas y las registra en lotes con
+      Gimnasio.registrar_ingresos_lote.
+    - Acota el buffer: si se llena, quien envía espera hasta `espera_maxima`
+      segundos y, si sigue lleno, la lectura se rechaza.
+    Sin hilo (por defecto) cada lote se registra en el mismo llamado que lo
+    completa; con iniciar() lo hace un hilo en segundo plano, que pasa a ser
+    el único que registra ingresos en el gimnasio.
+    """
+    def __init__(self, gimnasio, ventana_duplicados: timedelta = timedelta(seconds=30),
+                 tamano_lote: int = 500, capacidad: int = 10_000, espera_maxima: float = 1.0):
+        if tamano_lote < 1 or capacidad < tamano_lote:
+            raise ValueError("La capacidad debe ser al menos el tamaño de lote, y este positivo")
+        self.gimnasio = gimnasio
+        self.ventana_duplicados = ventana_duplicados
+        self.tamano_lote = tamano_lote
+        self.capacidad = capacidad
+        self.espera_maxima = espera_maxima
+        self._buffer: Deque[Tuple[str, datetime]] = deque()
+        # Última lectura aceptada por usuario, y el orden en que se aceptaron para depurarlas
+        self._ultima_lectura: Dict[str, datetime] = {}
+        self._orden: Deque[Tuple[datetime, str]] = deque()
+        self._condicion = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._activa = False
+        self.recibidas = 0
+        self.duplicadas = 0
+        self.rechazadas = 0
+        self.registradas = 0
+        self.fallidas = 0
+        self.lotes = 0
+        # Lotes que el hilo no pudo registrar por un error inesperado del gimnasio
+        self.lotes_fallidos = 0
+        # Solo se guardan los últimos errores (lecturas de usuarios inexistentes o congelados)
+        self.errores: Deque[Tuple[str, datetime, str]] = deque(maxlen=1000)
+
+    def _depurar(self, ahora: datetime) -> None:
+        # Olvida las lecturas que ya no pueden marcar a otra como duplicada
+        limite = ahora - self.ventana_duplicados
+        orden, ultima = self._orden, self._ultima_lectura
+        while orden and orden[0][0] <= limite:
+            momento, id_usuario = orden.popleft()
+            if ultima.get(id_usuario) == momento:
+                del ultima[id_usuario]
+
+    def recibir(self, id_usuario: str, momento: Optional[datetime] = None) -> str:
+        """
+        Recibe una lectura de torniquete
+        Returns:
+            'aceptado', 'duplicado' (dentro de la ventana) o 'rechazado' (buffer lleno)
+        """
+        momento = momento or datetime.now()
+        with self._condicion:
+            self.recibidas += 1
+            self._depurar(momento)
+            anterior = self._ultima_lectura.get(id_usuario)
+            if anterior is not None and abs(momento - anterior) < self.ventana_duplicados:
+                self.duplicadas += 1
+                return DUPLICADO
+            if len(self._buffer) >= self.capacidad:
+                if self._activa:
+                    self._condicion.wait_for(lambda: len(self._buffer) < self.capacidad,
+                                             timeout=self.espera_maxima)
+                if len(self._buffer) >= self.capacidad:
+                    self.rechazadas += 1
+                    return RECHAZADO
+            self._ultima_lectura[id_usuario] = momento
+            self._orden.append((momento, id_usuario))
+            self._buffer.append((id_usuario, momento))
+            if len(self._buffer) >= self.tamano_lote:
+                if self._activa:
+                    self._condicion.notify_all()
+                else:
+                    self._vaciar_lote()
+            return ACEPTADO
+
+    def _tomar_lote(self) -> List[Tuple[str, datetime]]:
+        buffer = self._buffer
+        lote = [buffer.popleft() for _ in range(min(self.tamano_lote, len(buffer)))]
+        self._condicion.notify_all()
+        return lote
+
+    def _registrar(self, lote: List[Tuple[str, datetime]]) -> None:
+        errores = self.gimnasio.registrar_ingresos_lote(
+            (id_usuario, momento.date(), momento, None) for id_usuario, momento in lote)
+        self.lotes += 1
+        self.registradas += len(lote) - len(errores)
+        self.fallidas += len(errores)
+        for posicion, mensaje in errores:
+            self.errores.append(lote[posicion] + (mensaje,))
+
+    def _vaciar_lote(self) -> None:
+        # Se llama con el lock tomado, en el modo sin hilo
+        self._registrar(self._tomar_lote())
+
+    def vaciar(self) -> int:
+        """
+        Registra todo lo pendiente en el buffer (sin hilo, o tras detener())
+        Returns:
+            Cantidad de lecturas enviadas al gimnasio
+        """
+        enviadas = 0
+        with self._condicion:
+            while self._buffer:
+                lote = self._tomar_lote()
+                self._registrar(lote)
+                enviadas += len(lote)
+        return enviadas
+
+    def iniciar(self, intervalo: float = 0.2) -> None:
+        """Registra los lotes desde un hilo: al llenarse un lote o cada `intervalo` segundos"""
+        def ciclo():
+            while True:
+                with self._condicion:
+                    self._condicion.wait_for(
+                        lambda: len(self._buffer) >= self.tamano_lote or not self._activa, timeout=intervalo)
+                    if not self._buffer and not self._activa:
+                        return
+                    lote = self._tomar_lote()
+                # El gimnasio se actualiza fuera del lock para no frenar a quienes envían
+                if lote:
+                    try:
+                        self._registrar(lote)
+                    except Exception as e:
+                        # Un lote con un error inesperado no debe detener la ingesta; sus
+                        # lecturas se cuentan como fallidas para que los contadores cierren
+                        self.lotes_fallidos += 1
+                        self.fallidas += len(lote)
+                        self.errores.extend(lectura + (str(e),) for lectura in lote)
+                        logger.error(f"Lote de {len(lote)} lecturas no registrado: {e}", exc_info=True)
+        self._activa = True
+        self._hilo = threading.Thread(target=ciclo, daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera: float = 5.0) -> None:
+        """Detiene el hilo después de registrar todo lo pendiente"""
+        with self._condicion:
+            self._activa = False
+            self._condicion.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+            self._hilo = None
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de la ingesta"""
+        return {
+            'recibidas': self.recibidas,
+            'duplicadas': self.duplicadas,
+            'rechazadas': self.rechazadas,
+            'registradas': self.registradas,
+            'fallidas': self.fallidas,
+            'lotes': self.lotes,
+            'lotes_fallidos': self.lotes_fallidos,
+            'pendientes': len(self._buffer),
+            'proporcion_duplicadas': self.duplicadas / self.recibidas if self.recibidas else 0.0,
+        }